@@ -0,0 +1,125 @@
+import bisect
+import threading
+import time
+from models import db, Artist, Venue
+
+#----------------------------------------------------------------------------#
+# Autocomplete.
+#----------------------------------------------------------------------------#
+
+
+def _keys(entity_id, name):
+    # index every word start, so "hop" finds "The Musical Hop"
+    words = name.lower().split()
+    return [(' '.join(words[i:]), entity_id) for i in range(len(words))]
+
+
+class PrefixIndex(object):
+    """Sorted array of (key, id) pairs answering prefix queries with bisect."""
+
+    def __init__(self):
+        self._entries = []
+        self._names = {}
+        self._lock = threading.Lock()
+
+    def rebuild(self, rows):
+        names = dict(rows)
+        entries = sorted(key for entity_id, name in names.items()
+                         for key in _keys(entity_id, name))
+        with self._lock:
+            self._entries = entries
+            self._names = names
+
+    def add(self, entity_id, name):
+        with self._lock:
+            self._remove(entity_id)
+            self._names[entity_id] = name
+            for key in _keys(entity_id, name):
+                bisect.insort(self._entries, key)
+
+    def remove(self, entity_id):
+        with self._lock:
+            self._remove(entity_id)
+
+    def _remove(self, entity_id):
+        name = self._names.pop(entity_id, None)
+        if name is None:
+            return
+        for key in _keys(entity_id, name):
+            i = bisect.bisect_left(self._entries, key)
+            if i < len(self._entries) and self._entries[i] == key:
+                del self._entries[i]
+
+    def search(self, prefix, limit=10):
+        prefix = ' '.join(prefix.lower().split())
+        if not prefix:
+            return []
+
+        results, seen = [], set()
+        with self._lock:
+            i = bisect.bisect_left(self._entries, (prefix,))
+            while i < len(self._entries) and len(results) < limit:
+                key, entity_id = self._entries[i]
+                if not key.startswith(prefix):
+                    break
+                if entity_id not in seen:
+                    seen.add(entity_id)
+                    results.append({'id': entity_id, 'name': self._names[entity_id]})
+                i += 1
+        return results
+
+
+class Autocomplete(object):
+    """Per-process name indexes for the artist and venue pickers.
+
+    Each index is loaded with one query on first use, updated in place after
+    writes in this process and fully reloaded every ``AUTOCOMPLETE_REFRESH``
+    seconds to pick up writes made by other workers.
+    """
+
+    def __init__(self, app=None, tasks=None):
+        self.indexes = {'artist': PrefixIndex(), 'venue': PrefixIndex()}
+        self._models = {'artist': Artist, 'venue': Venue}
+        self._loaded_at = {}
+        if app is not None:
+            self.init_app(app, tasks)
+
+    def init_app(self, app, tasks):
+        app.config.setdefault('AUTOCOMPLETE_LIMIT', 10)
+        app.config.setdefault('AUTOCOMPLETE_REFRESH', 300)
+        self.app = app
+        app.extensions['autocomplete'] = self
+
+        tasks.post_write('artist')(self._artist_written)
+        tasks.post_write('venue')(self._venue_written)
+
+    def _load(self, kind):
+        loaded_at = self._loaded_at.get(kind)
+        if (loaded_at is not None and
+                time.time() - loaded_at < self.app.config['AUTOCOMPLETE_REFRESH']):
+            return
+        model = self._models[kind]
+        self.indexes[kind].rebuild(db.session.query(model.id, model.name).all())
+        self._loaded_at[kind] = time.time()
+
+    def search(self, kind, prefix):
+        self._load(kind)
+        return self.indexes[kind].search(prefix, self.app.config['AUTOCOMPLETE_LIMIT'])
+
+    def _written(self, kind, entity_id):
+        if kind not in self._loaded_at:
+            return
+        entity = self._models[kind].query.get(entity_id)
+        if entity is None:
+            self.indexes[kind].remove(entity_id)
+        else:
+            self.indexes[kind].add(entity_id, entity.name)
+
+    def _artist_written(self, artist_id):
+        self._written('artist', artist_id)
+
+    def _venue_written(self, venue_id):
+        self._written('venue', venue_id)
+
+
+autocomplete = Autocomplete()
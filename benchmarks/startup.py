@@ -0,0 +1,68 @@
+"""Measure worker boot time: importing app.py and calling create_app().
+
+    python benchmarks/startup.py [--runs N] [--top N]
+
+Every run is a fresh interpreter started with ``-X importtime``, so the
+numbers include everything a gunicorn worker or a ``flask`` CLI command
+pays before serving its first request.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BOOT = (
+    'import time; start = time.perf_counter(); '
+    'from app import create_app; create_app(); '
+    'print(time.perf_counter() - start)'
+)
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def run_once():
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', BOOT],
+        cwd=ROOT, capture_output=True, text=True, check=True)
+
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            # only imports made directly by our own code or its first level
+            if len(indent) <= 3:
+                modules[name] = int(cumulative_us)
+    wall = float(result.stdout.strip().splitlines()[-1])
+    return wall, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    walls, runs = [], []
+    for _ in range(args.runs):
+        wall, modules = run_once()
+        walls.append(wall)
+        runs.append(modules)
+
+    print('create_app() boot: median %.1f ms, min %.1f ms over %d runs' % (
+        statistics.median(walls) * 1000, min(walls) * 1000, args.runs))
+
+    names = set().union(*runs)
+    medians = {name: statistics.median(run.get(name, 0) for run in runs)
+               for name in names}
+    print('\nslowest imports (median cumulative):')
+    for name, us in sorted(medians.items(), key=lambda item: -item[1])[:args.top]:
+        print('  %8.1f ms  %s' % (us / 1000, name))
+
+
+if __name__ == '__main__':
+    main()
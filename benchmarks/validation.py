@@ -0,0 +1,95 @@
+"""Measure venue form validations per second: WTForms vs validation.VENUE.
+
+    python benchmarks/validation.py [--seconds N]
+
+Both paths validate the same valid and invalid submissions inside a test
+request context, the way create_venue_submission() sees them. No database
+is touched.
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from flask import Flask  # noqa: E402
+from werkzeug.datastructures import MultiDict  # noqa: E402
+
+VALID = MultiDict([
+    ('name', 'The Musical Hop'),
+    ('city', 'San Francisco'),
+    ('state', 'CA'),
+    ('address', '1015 Folsom Street'),
+    ('phone', '123-123-1234'),
+    ('genres', 'Jazz'),
+    ('genres', 'Reggae'),
+    ('genres', 'Folk'),
+    ('facebook_link', 'https://www.facebook.com/TheMusicalHop'),
+    ('image_link', 'https://images.unsplash.com/photo-1543900694'),
+    ('website_link', 'https://www.themusicalhop.com'),
+    ('seeking_talent', 'y'),
+    ('seeking_description', 'We are on the lookout for a local artist.'),
+])
+
+INVALID = MultiDict([
+    ('name', ''),
+    ('city', 'San Francisco'),
+    ('state', 'XX'),
+    ('address', '1015 Folsom Street'),
+    ('phone', '1231231234'),
+    ('genres', 'Polka'),
+    ('facebook_link', 'facebook'),
+    ('image_link', ''),
+])
+
+
+def wtforms_validate(form_class):
+    return form_class().validate()
+
+
+def schema_validate(schema, data):
+    import validation
+    try:
+        schema.validate(data)
+        return True
+    except validation.ValidationError:
+        return False
+
+
+def rate(func, seconds):
+    count, start = 0, time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            func()
+        count += 100
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=2.0)
+    args = parser.parse_args()
+
+    from forms import VenueForm
+    import validation
+    # flask_wtf asks for its Form rename warning on every instance
+    warnings.filterwarnings('ignore', message='"flask_wtf.Form" has been renamed')
+
+    app = Flask(__name__)
+    app.config.update(SECRET_KEY='benchmark', WTF_CSRF_ENABLED=False)
+
+    for label, data in (('valid', VALID), ('invalid', INVALID)):
+        with app.test_request_context('/venues/create', method='POST', data=data):
+            assert wtforms_validate(VenueForm) == schema_validate(validation.VENUE, data)
+            wtf = rate(lambda: wtforms_validate(VenueForm), args.seconds)
+            compiled = rate(lambda: schema_validate(validation.VENUE, data), args.seconds)
+        print('%-8s WTForms %9.0f/s   validation.VENUE %9.0f/s   %5.1fx' % (
+            label, wtf, compiled, compiled / wtf))
+
+
+if __name__ == '__main__':
+    main()
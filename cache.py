@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+#----------------------------------------------------------------------------#
+# Page cache.
+#----------------------------------------------------------------------------#
+
+
+class FileCache(object):
+    """JSON-on-disk cache shared by every worker and by CLI commands.
+
+    Keys are namespaced by a generation number kept in the cache directory;
+    ``invalidate()`` bumps it, which orphans every existing entry at once,
+    and then deletes the files of older generations. Expired entries are
+    deleted when they are next read, so the directory holds at most one
+    file per key of the current generation.
+
+    ``get``/``set`` take an optional ``generation`` read earlier with
+    ``generation()``: a value built from the database before a write is
+    then stored under the generation that write already invalidated.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('CACHE_DIR', os.path.join(app.instance_path, 'cache'))
+        app.config.setdefault('CACHE_TTL', 300)
+        self.directory = app.config['CACHE_DIR']
+        self.ttl = app.config['CACHE_TTL']
+        os.makedirs(self.directory, exist_ok=True)
+        app.extensions['page_cache'] = self
+
+    def generation(self):
+        try:
+            with open(os.path.join(self.directory, 'generation')) as f:
+                return f.read().strip()
+        except (IOError, OSError):
+            return '0'
+
+    def _path(self, key, generation=None):
+        name = '%s-%s.json' % (generation or self.generation(),
+                               hashlib.sha1(key.encode('utf-8')).hexdigest())
+        return os.path.join(self.directory, name)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except (IOError, OSError):
+            pass
+
+    def _write(self, path, content):
+        # write then rename so readers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+        os.replace(tmp, path)
+
+    def get(self, key, generation=None):
+        path = self._path(key, generation)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+        if entry['expires'] < time.time():
+            self._remove(path)
+            return None
+        return entry['value']
+
+    def set(self, key, value, ttl=None, generation=None):
+        entry = {
+            'expires': time.time() + (ttl or self.ttl),
+            'value': value
+        }
+        self._write(self._path(key, generation), json.dumps(entry))
+
+    def get_or_set(self, key, build, ttl=None, generation=None):
+        value = self.get(key, generation)
+        if value is None:
+            value = build()
+            if value is not None:
+                self.set(key, value, ttl, generation)
+        return value
+
+    def invalidate(self):
+        generation = str(int(self.generation()) + 1)
+        self._write(os.path.join(self.directory, 'generation'), generation)
+        self.prune(generation)
+
+    def prune(self, generation=None):
+        # entries of any other generation can never be read again
+        prefix = (generation or self.generation()) + '-'
+        for name in os.listdir(self.directory):
+            if name.endswith('.json') and not name.startswith(prefix):
+                self._remove(os.path.join(self.directory, name))
+
+
+class MemoryCache(object):
+    """Small per-process LRU cache with a short TTL, for hot query results."""
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SEARCH_CACHE_TTL', 10)
+        app.config.setdefault('SEARCH_CACHE_SIZE', 1000)
+        self.ttl = app.config['SEARCH_CACHE_TTL']
+        self.size = app.config['SEARCH_CACHE_SIZE']
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.time():
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def get_or_set(self, key, build):
+        value = self.get(key)
+        if value is None:
+            value = build()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
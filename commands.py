@@ -0,0 +1,97 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import click
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+from models import db, Show
+import partitions
+import rankings
+from profiling import profiler
+
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+def popular_ids(column, limit):
+    return [row[0] for row in db.session.query(column).group_by(column)
+            .order_by(db.func.count().desc()).limit(limit)]
+
+
+def warm_cache(top=None, workers=None):
+    app = current_app._get_current_object()
+    top = top or app.config['WARM_CACHE_TOP_N']
+    workers = workers or app.config['WARM_CACHE_WORKERS']
+
+    with app.app_context():
+        # never render more pages at once than the pool has connections
+        pool_size = getattr(db.engine.pool, 'size', lambda: workers)()
+        workers = max(1, min(workers, pool_size))
+
+        paths = ['/venues', '/artists', '/shows']
+        paths += ['/venues/%d' % i for i in popular_ids(Show.venue_id, top)]
+        paths += ['/artists/%d' % i for i in popular_ids(Show.artist_id, top)]
+
+    def warm(path):
+        with app.test_client() as client:
+            return path, client.get(path).status_code
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(warm, paths))
+
+
+@click.command('warm-cache')
+@click.option('--top', type=int, help='Number of venues and artists to precompute.')
+@click.option('--workers', type=int, help='Maximum number of concurrent renders.')
+@with_appcontext
+def warm_cache_command(top, workers):
+    """Precompute listing pages and the most booked detail pages."""
+    start = time.time()
+    results = warm_cache(top, workers)
+    for path, status in results:
+        click.echo('%d %s' % (status, path))
+    click.echo('Warmed %d pages in %.2fs' % (len(results), time.time() - start))
+
+
+shows_cli = AppGroup('shows', help='Maintain the partitioned Show table.')
+
+
+@shows_cli.command('partition')
+@click.option('--ahead', type=int, help='Number of future years to create partitions for.')
+def partition_command(ahead):
+    """Create yearly Show partitions up to a few years ahead."""
+    partitions.ensure_partitions(ahead or current_app.config['SHOW_PARTITIONS_AHEAD'])
+    click.echo('Live partitions: %s' % ', '.join(map(str, partitions.live_years())))
+
+
+@shows_cli.command('archive')
+@click.option('--before', type=int, help='Archive every year before this one.')
+def archive_command(before):
+    """Move past yearly Show partitions to ShowArchive."""
+    config = current_app.config
+    before = before or time.localtime().tm_year - config['SHOW_ARCHIVE_AFTER_YEARS']
+    archived = partitions.archive_partitions(before, config['SHOW_ARCHIVE_TABLESPACE'])
+    click.echo('Archived: %s' % (', '.join(map(str, archived)) or 'nothing'))
+    click.echo('Archive partitions: %s' % ', '.join(map(str, partitions.archived_years())))
+
+
+rankings_cli = AppGroup('rankings', help='Maintain the home page rankings.')
+
+
+@rankings_cli.command('refresh')
+def refresh_rankings_command():
+    """Recompute the popular and recently listed artists and venues."""
+    start = time.time()
+    count = rankings.refresh()
+    click.echo('Ranked %d entries in %.2fs' % (count, time.time() - start))
+
+
+profile_cli = AppGroup('profile', help='Profile single requests.')
+
+
+@profile_cli.command('token')
+def profile_token_command():
+    """Print a token that enables profiling for requests carrying it."""
+    config = current_app.config
+    click.echo('%s: %s' % (config['PROFILE_HEADER'], profiler.token()))
+    click.echo('Valid for %ds, profiles are saved to %s'
+               % (config['PROFILE_TOKEN_MAX_AGE'], config['PROFILE_DIR']))
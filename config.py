@@ -1,13 +1,134 @@
 import os
-SECRET_KEY = os.urandom(32)
 # Grabs the folder where the script runs.
 basedir = os.path.abspath(os.path.dirname(__file__))
 
+
+def load_secret_key(path=os.path.join(basedir, 'instance', 'secret_key')):
+    # every worker must sign sessions with the same key, so fall back to one
+    # generated once and kept on disk instead of a fresh os.urandom() per process
+    if os.environ.get('SECRET_KEY'):
+        return os.environ['SECRET_KEY']
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = '%s.%d' % (path, os.getpid())
+        with open(tmp, 'wb') as f:
+            f.write(os.urandom(32))
+        try:
+            # link() fails if another worker created the key first
+            os.link(tmp, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp)
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+SECRET_KEY = load_secret_key()
+
 # Enable debug mode.
 DEBUG = True
 
+# Event tracking is unused and adds overhead to every session flush.
+SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# Ping pooled connections before use and never wait long for a connection,
+# so a database outage fails fast instead of piling up blocked workers
+SQLALCHEMY_ENGINE_OPTIONS = {
+    'pool_pre_ping': True,
+    'pool_timeout': 5,
+    'connect_args': {'connect_timeout': 3}
+}
+
 # Connect to the database
 
 
 # TODO IMPLEMENT DATABASE URL
 SQLALCHEMY_DATABASE_URI = 'postgresql://harimohan@localhost:5432/fyyur'
+
+# Background task queue (see tasks.py)
+TASK_WORKERS = 2
+TASK_MAX_RETRIES = 3
+TASK_RETRY_DELAY = 1.0
+
+# Local thumbnails for image_link fields (see images.py)
+THUMBNAIL_DIR = os.path.join(basedir, 'instance', 'thumbs')
+THUMBNAIL_MAX_AGE = 365 * 24 * 60 * 60
+
+# Rendered page cache shared by all workers (see cache.py)
+CACHE_DIR = os.path.join(basedir, 'instance', 'cache')
+CACHE_TTL = 300
+
+# `flask warm-cache` settings; set WARM_CACHE_ON_STARTUP to warm in the
+# background whenever a worker boots
+WARM_CACHE_TOP_N = 20
+WARM_CACHE_WORKERS = 4
+WARM_CACHE_ON_STARTUP = False
+
+# Show is partitioned by year of start_time (see partitions.py). Years older
+# than SHOW_ARCHIVE_AFTER_YEARS are moved to ShowArchive by `flask shows
+# archive`, onto SHOW_ARCHIVE_TABLESPACE when it is set.
+SHOW_PARTITIONS_AHEAD = 2
+SHOW_ARCHIVE_AFTER_YEARS = 1
+SHOW_ARCHIVE_TABLESPACE = None
+
+# Typeahead for the new show form (see autocomplete.py)
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_REFRESH = 300
+
+# Venue/artist search: results are kept in memory for SEARCH_CACHE_TTL
+# seconds, and each client may run SEARCH_RATE_BURST uncached searches at
+# once, refilled at SEARCH_RATE_LIMIT per second (see throttle.py)
+SEARCH_CACHE_TTL = 10
+SEARCH_CACHE_SIZE = 1000
+SEARCH_RATE_LIMIT = 2.0
+SEARCH_RATE_BURST = 10
+
+# Proxies in front of the app whose X-Forwarded-For/-Proto headers are
+# trusted, so per-client limits see the client's address. Heroku's router is
+# one; set PROXY_COUNT explicitly anywhere else that runs behind a proxy.
+PROXY_COUNT = int(os.environ.get('PROXY_COUNT', 1 if 'DYNO' in os.environ else 0))
+
+# Password for the /admin pages (HTTP basic auth, any user name); they answer
+# 404 while it is unset
+ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD')
+
+# What deleting a venue or artist does to its rows: 'cascade' removes them
+# and their shows, 'archive' does the same but keeps a JSON copy of every
+# removed row in DeletedRecord
+DELETE_POLICY = 'cascade'
+
+# Home page rankings (see rankings.py). Bookings between RANKING_PAST_DAYS
+# ago and RANKING_UPCOMING_DAYS ahead count towards "popular". Rankings are
+# refreshed RANKING_REFRESH_DELAY seconds after venue, artist and show
+# writes, and when the home page finds them empty. Set RANKING_REFRESH to a
+# number of seconds to also refresh on a timer in every worker (bookings
+# move from upcoming to past without any write), or run
+# `flask rankings refresh` from cron.
+RANKING_SIZE = 6
+RANKING_PAST_DAYS = 30
+RANKING_UPCOMING_DAYS = 90
+RANKING_REFRESH_DELAY = 10
+RANKING_REFRESH = None
+
+# Seconds calendar clients and proxies may reuse a schedule feed (see
+# feeds.py) before revalidating it
+FEED_MAX_AGE = 300
+
+# Per-request profiling (see profiling.py). Profile every request with
+# PROFILING_ENABLED, or single requests by sending the header printed by
+# `flask profile token`. PROFILER is 'cprofile' or 'pyinstrument'.
+PROFILING_ENABLED = False
+PROFILE_DIR = os.path.join(basedir, 'instance', 'profiles')
+PROFILE_HEADER = 'X-Profile'
+PROFILE_TOKEN_MAX_AGE = 3600
+PROFILER = 'cprofile'
+
+# Database resilience (see resilience.py): idempotent reads are retried
+# DB_READ_RETRIES times after a dropped connection, and after
+# DB_BREAKER_THRESHOLD consecutive connection failures new connections are
+# refused for DB_BREAKER_RESET seconds
+DB_READ_RETRIES = 2
+DB_RETRY_DELAY = 0.1
+DB_BREAKER_THRESHOLD = 5
+DB_BREAKER_RESET = 30
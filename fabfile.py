@@ -1,16 +1,14 @@
 from fabric.api import local, settings, abort
-from fabric.contrib.console import confirm
 
 # prepare for deployment
 
 
 def test():
+    # correctness and performance budgets; a failure blocks the deploy
     with settings(warn_only=True):
-        result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
-        )
-    if result.failed and not confirm("Tests failed. Continue?"):
-        abort("Aborted at user request.")
+        result = local("python -m pytest -q tests")
+    if result.failed:
+        abort("Tests failed.")
 
 
 def commit():
@@ -38,18 +36,11 @@ def heroku():
     local("git push heroku master")
 
 
-def heroku_test():
-    local(
-        "heroku run python test_tasks.py -v && heroku run python test_users.py -v"
-    )
-
-
 def deploy():
     pull()
     test()
     commit()
     heroku()
-    heroku_test()
 
 # rollback
 
@@ -0,0 +1,129 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+from flask import Response, current_app, request, stream_with_context
+from werkzeug.http import is_resource_modified
+from models import db, Artist, Show, Venue
+
+#----------------------------------------------------------------------------#
+# Schedule feeds.
+#----------------------------------------------------------------------------#
+
+# /venues/<id>/schedule.(ics|json) and /artists/<id>/schedule.(ics|json)
+# list upcoming shows. The ETag comes from one aggregate over the entity's
+# upcoming shows (count, newest created_at and the versions of the artists
+# or venues they name), so a poll that has nothing new is answered with a
+# 304 without fetching a single show. There is no Last-Modified: removed
+# shows (a cascaded delete of the other side) leave no timestamp behind, so
+# If-Modified-Since alone could never tell.
+
+FEED_ROWS_PER_FETCH = 500
+
+
+def _etag(column, other, entity):
+    other_id = Show.artist_id if other is Artist else Show.venue_id
+    count, latest, others = db.session.query(
+        db.func.count(), db.func.max(Show.created_at), db.func.sum(other.version_id)
+    ).select_from(Show).join(other, other.id == other_id).filter(
+        column == entity.id, Show.start_time > datetime.now()).one()
+
+    # the entity's version covers edits to its own name and address; the
+    # sum of the other side's versions grows with every edit to one of them
+    tag = '%s:%d:%d:%d:%s:%s' % (entity.__tablename__, entity.id, entity.version_id,
+                                 count, latest and latest.isoformat(), others)
+    return hashlib.sha1(tag.encode('utf-8')).hexdigest()
+
+
+def _rows(column, other, entity):
+    # one query on the (venue_id|artist_id, start_time) index, fetched in
+    # batches so large schedules are never held in memory at once
+    return db.session.query(
+        Show.show_id, Show.start_time, Show.created_at, other.id, other.name,
+        Venue.address, Venue.city, Venue.state
+    ).select_from(Show).join(Artist, Artist.id == Show.artist_id).join(
+        Venue, Venue.id == Show.venue_id
+    ).filter(column == entity.id, Show.start_time > datetime.now()).order_by(
+        Show.start_time).yield_per(FEED_ROWS_PER_FETCH)
+
+
+#  iCalendar
+#  ----------------------------------------------------------------
+
+def _ical_text(value):
+    return (value or '').replace('\\', '\\\\').replace(';', '\\;') \
+        .replace(',', '\\,').replace('\n', '\\n')
+
+
+def _ical_line(name, value):
+    # content lines are folded at 75 octets
+    line = ('%s:%s' % (name, value)).encode('utf-8')
+    chunks = []
+    while len(line) > 75:
+        cut = 75 if not chunks else 74
+        # never split a multi-byte character
+        while cut and (line[cut] & 0xC0) == 0x80:
+            cut -= 1
+        chunks.append(line[:cut])
+        line = line[cut:]
+    chunks.append(line)
+    return b'\r\n '.join(chunks).decode('utf-8') + '\r\n'
+
+
+def _ical(entity, rows, summary):
+    yield _ical_line('BEGIN', 'VCALENDAR')
+    yield _ical_line('VERSION', '2.0')
+    yield _ical_line('PRODID', '-//Fyyur//Schedule//EN')
+    yield _ical_line('X-WR-CALNAME', _ical_text(entity.name))
+    for show_id, start_time, created_at, other_id, other_name, address, city, state in rows:
+        yield _ical_line('BEGIN', 'VEVENT')
+        yield _ical_line('UID', 'show-%d@fyyur' % show_id)
+        yield _ical_line('DTSTAMP', created_at.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ'))
+        yield _ical_line('DTSTART', start_time.strftime('%Y%m%dT%H%M%S'))
+        yield _ical_line('SUMMARY', _ical_text(summary(entity.name, other_name)))
+        yield _ical_line('LOCATION', _ical_text(', '.join(filter(None, (address, city, state)))))
+        yield _ical_line('END', 'VEVENT')
+    yield _ical_line('END', 'VCALENDAR')
+
+
+#  JSON
+#  ----------------------------------------------------------------
+
+def _json(entity, rows, kind, other_kind):
+    yield '{"%s": %s, "shows": [' % (kind, json.dumps({'id': entity.id, 'name': entity.name}))
+    separator = ''
+    for show_id, start_time, created_at, other_id, other_name, address, city, state in rows:
+        yield separator + json.dumps({
+            'show_id': show_id,
+            'start_time': start_time.strftime('%Y-%m-%dT%H:%M:%S'),
+            other_kind + '_id': other_id,
+            other_kind + '_name': other_name,
+            'address': address,
+            'city': city,
+            'state': state
+        })
+        separator = ', '
+    yield ']}'
+
+
+def schedule(entity, fmt):
+    if isinstance(entity, Venue):
+        column, other, kind, other_kind = Show.venue_id, Artist, 'venue', 'artist'
+        summary = lambda venue, artist: '%s at %s' % (artist, venue)
+    else:
+        column, other, kind, other_kind = Show.artist_id, Venue, 'artist', 'venue'
+        summary = lambda artist, venue: '%s at %s' % (artist, venue)
+
+    etag = _etag(column, other, entity)
+    if not is_resource_modified(request.environ, etag):
+        response = Response(status=304)
+    elif fmt == 'ics':
+        response = Response(stream_with_context(_ical(entity, _rows(column, other, entity), summary)),
+                            mimetype='text/calendar')
+    else:
+        response = Response(stream_with_context(_json(entity, _rows(column, other, entity), kind, other_kind)),
+                            mimetype='application/json')
+
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config['FEED_MAX_AGE']
+    return response
@@ -0,0 +1,270 @@
+import hashlib
+import http.client
+import io
+import ipaddress
+import os
+import re
+import socket
+import tempfile
+import threading
+import time
+import urllib.request
+from flask import abort, request, send_from_directory, url_for
+from models import db, Artist, Thumbnail, Venue
+
+#----------------------------------------------------------------------------#
+# Image thumbnails.
+#----------------------------------------------------------------------------#
+
+# name -> bounding box; thumbnails keep their aspect ratio
+THUMBNAIL_SIZES = {
+    'small': (320, 320),
+    'large': (960, 960),
+}
+
+DIGEST_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+def _connect_public(address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, source_address=None):
+    # image links are user input: the host is resolved here and every
+    # address must be public, so neither a link nor a redirect can reach
+    # loopback, private, link-local (cloud metadata) or reserved addresses.
+    # The socket goes to the address that was checked, not a second lookup.
+    host, port = address
+    addresses = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+    for family, type, proto, canonname, sockaddr in addresses:
+        ip = ipaddress.ip_address(sockaddr[0].split('%', 1)[0])
+        if ip.version == 6 and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+        if not ip.is_global:
+            raise ValueError('Refusing to fetch image from non-public address %s (%s)' % (ip, host))
+
+    error = None
+    for family, type, proto, canonname, sockaddr in addresses:
+        sock = socket.socket(family, type, proto)
+        try:
+            if timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                sock.settimeout(timeout)
+            if source_address:
+                sock.bind(source_address)
+            sock.connect(sockaddr)
+            return sock
+        except OSError as e:
+            sock.close()
+            error = e
+    raise error
+
+
+class _PublicHTTPConnection(http.client.HTTPConnection):
+
+    def __init__(self, *args, **kwargs):
+        super(_PublicHTTPConnection, self).__init__(*args, **kwargs)
+        self._create_connection = _connect_public
+
+
+class _PublicHTTPSConnection(http.client.HTTPSConnection):
+
+    def __init__(self, *args, **kwargs):
+        super(_PublicHTTPSConnection, self).__init__(*args, **kwargs)
+        self._create_connection = _connect_public
+
+
+class _PublicHTTPHandler(urllib.request.HTTPHandler):
+
+    def http_open(self, req):
+        return self.do_open(_PublicHTTPConnection, req)
+
+
+class _PublicHTTPSHandler(urllib.request.HTTPSHandler):
+
+    def https_open(self, req):
+        return self.do_open(_PublicHTTPSConnection, req, context=self._context)
+
+
+def _opener():
+    # http(s) only, no proxies; redirects are followed through the same
+    # handlers, so every hop is checked by _connect_public
+    opener = urllib.request.OpenerDirector()
+    for handler in (_PublicHTTPHandler(), _PublicHTTPSHandler(),
+                    urllib.request.HTTPRedirectHandler(),
+                    urllib.request.HTTPDefaultErrorHandler(),
+                    urllib.request.HTTPErrorProcessor()):
+        opener.add_handler(handler)
+    return opener
+
+
+def fetch_url(url, timeout=5, max_bytes=10 * 1024 * 1024):
+    if not url.lower().startswith(('http://', 'https://')):
+        raise ValueError('Refusing to fetch non-HTTP image URL %r' % url)
+    with _opener().open(url, timeout=timeout) as response:
+        data = response.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        raise ValueError('Image at %r is larger than %d bytes' % (url, max_bytes))
+    return data
+
+
+class ThumbnailStore(object):
+    """Fetches each external ``image_link`` once and serves local thumbnails.
+
+    Templates go through the ``thumbnail`` filter: a known URL maps to
+    ``/thumbs/<digest>/<size>``, an unknown one is queued for fetching and
+    the original URL is used until the thumbnail exists. Files are named
+    after the image content hash, so they can be cached forever.
+    """
+
+    def __init__(self, app=None, tasks=None, fetcher=fetch_url):
+        self.fetcher = fetcher
+        self.tasks = tasks
+        self._digests = {}
+        self._pending = set()
+        self._failed = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app, tasks)
+
+    def init_app(self, app, tasks):
+        app.config.setdefault('THUMBNAIL_DIR',
+                              os.path.join(app.instance_path, 'thumbs'))
+        app.config.setdefault('THUMBNAIL_MAX_AGE', 365 * 24 * 60 * 60)
+        app.config.setdefault('THUMBNAIL_REFRESH', 60)
+        app.config.setdefault('THUMBNAIL_RETRY_AFTER', 60 * 60)
+        # decoded size limit, checked from the header before any pixel is read
+        app.config.setdefault('THUMBNAIL_MAX_PIXELS', 40 * 1000 * 1000)
+        self.app = app
+        self.tasks = tasks
+        app.extensions['thumbnails'] = self
+        app.jinja_env.filters['thumbnail'] = self.thumbnail_url
+        app.add_url_rule('/thumbs/<digest>/<size>', 'thumbnail', self.serve)
+
+        tasks.post_write('venue')(self._venue_written)
+        tasks.post_write('artist')(self._artist_written)
+
+    #  Lookup
+    #  ----------------------------------------------------------------
+
+    def _refresh(self):
+        # other workers may have produced thumbnails; reload the whole
+        # url -> digest map in one query every THUMBNAIL_REFRESH seconds
+        now = time.time()
+        if (self._loaded_at is not None and
+                now - self._loaded_at < self.app.config['THUMBNAIL_REFRESH']):
+            return
+        rows = db.session.query(Thumbnail.source_url, Thumbnail.digest).all()
+        with self._lock:
+            self._digests.update(rows)
+            self._loaded_at = now
+
+    def thumbnail_url(self, source_url, size='small'):
+        if not source_url:
+            return source_url
+        self._refresh()
+        digest = self._digests.get(source_url)
+        if digest is not None:
+            return url_for('thumbnail', digest=digest, size=size)
+
+        # broken links are not refetched on every render
+        retry_after = self.app.config['THUMBNAIL_RETRY_AFTER']
+        with self._lock:
+            recently_failed = (time.time() - self._failed.get(source_url, 0)
+                               < retry_after)
+            queued = source_url in self._pending or recently_failed
+            if not queued:
+                self._pending.add(source_url)
+        if not queued:
+            self.tasks.enqueue(self.ensure, source_url)
+        return source_url
+
+    #  Generation
+    #  ----------------------------------------------------------------
+
+    def ensure(self, source_url):
+        try:
+            thumbnail = Thumbnail.query.get(source_url)
+            if thumbnail is not None and self._exists(thumbnail.digest):
+                digest = thumbnail.digest
+            else:
+                digest = self._generate(self.fetcher(source_url))
+                db.session.merge(Thumbnail(source_url=source_url, digest=digest))
+                db.session.commit()
+            with self._lock:
+                self._digests[source_url] = digest
+                self._failed.pop(source_url, None)
+        except Exception:
+            with self._lock:
+                self._failed[source_url] = time.time()
+            raise
+        finally:
+            with self._lock:
+                self._pending.discard(source_url)
+
+    def _path(self, digest, size, ext):
+        return os.path.join(self.app.config['THUMBNAIL_DIR'],
+                            '%s-%s.%s' % (digest, size, ext))
+
+    def _exists(self, digest):
+        return all(os.path.exists(self._path(digest, size, ext))
+                   for size in THUMBNAIL_SIZES for ext in ('webp', 'jpg'))
+
+    def _generate(self, data):
+        from PIL import Image, ImageOps
+
+        digest = hashlib.sha256(data).hexdigest()[:32]
+        if self._exists(digest):
+            return digest
+
+        directory = self.app.config['THUMBNAIL_DIR']
+        os.makedirs(directory, exist_ok=True)
+        original = Image.open(io.BytesIO(data))
+        width, height = original.size
+        if width * height > self.app.config['THUMBNAIL_MAX_PIXELS']:
+            raise ValueError('Image of %dx%d pixels is too large to thumbnail' % (width, height))
+        original = ImageOps.exif_transpose(original).convert('RGB')
+        for size, box in THUMBNAIL_SIZES.items():
+            image = original.copy()
+            image.thumbnail(box, Image.LANCZOS)
+            for ext, format, options in (('webp', 'WEBP', {'quality': 80}),
+                                         ('jpg', 'JPEG', {'quality': 85, 'optimize': True})):
+                # write then rename so a half-written file is never served;
+                # the temporary name is unique, as other workers may be
+                # thumbnailing the same image
+                fd, tmp = tempfile.mkstemp(dir=directory)
+                try:
+                    with os.fdopen(fd, 'wb') as f:
+                        image.save(f, format, **options)
+                    os.replace(tmp, self._path(digest, size, ext))
+                except BaseException:
+                    os.remove(tmp)
+                    raise
+        return digest
+
+    def _venue_written(self, venue_id):
+        venue = Venue.query.get(venue_id)
+        if venue is not None and venue.image_link:
+            self.ensure(venue.image_link)
+
+    def _artist_written(self, artist_id):
+        artist = Artist.query.get(artist_id)
+        if artist is not None and artist.image_link:
+            self.ensure(artist.image_link)
+
+    #  Serving
+    #  ----------------------------------------------------------------
+
+    def serve(self, digest, size):
+        if not DIGEST_RE.match(digest) or size not in THUMBNAIL_SIZES:
+            abort(404)
+
+        webp = any(mimetype == 'image/webp'
+                   for mimetype, quality in request.accept_mimetypes)
+        filename = '%s-%s.%s' % (digest, size, 'webp' if webp else 'jpg')
+        response = send_from_directory(
+            self.app.config['THUMBNAIL_DIR'], filename,
+            max_age=self.app.config['THUMBNAIL_MAX_AGE'])
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        response.vary.add('Accept')
+        return response
+
+
+thumbnails = ThumbnailStore()
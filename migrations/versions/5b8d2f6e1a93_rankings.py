@@ -0,0 +1,36 @@
+"""home page rankings
+
+Revision ID: 5b8d2f6e1a93
+Revises: e71b3d8a4c22
+Create Date: 2026-10-19 16:21:09.402716
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '5b8d2f6e1a93'
+down_revision = 'e71b3d8a4c22'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('Artist', sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False))
+    op.add_column('Venue', sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False))
+    op.create_table('Ranking',
+    sa.Column('kind', sa.String(length=32), nullable=False),
+    sa.Column('rank', sa.Integer(), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('image_link', sa.String(length=500), nullable=True),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('kind', 'rank')
+    )
+
+
+def downgrade():
+    op.drop_table('Ranking')
+    op.drop_column('Venue', 'created_at')
+    op.drop_column('Artist', 'created_at')
@@ -0,0 +1,27 @@
+"""thumbnail
+
+Revision ID: 7d1e5a9b3c26
+Revises: 3f2a9c1d7b4e
+Create Date: 2026-10-19 09:48:17.604512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '7d1e5a9b3c26'
+down_revision = '3f2a9c1d7b4e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('Thumbnail',
+    sa.Column('source_url', sa.String(length=500), nullable=False),
+    sa.Column('digest', sa.String(length=64), nullable=False),
+    sa.PrimaryKeyConstraint('source_url')
+    )
+
+
+def downgrade():
+    op.drop_table('Thumbnail')
@@ -0,0 +1,85 @@
+"""partition Show by start_time
+
+Revision ID: 9c4e7a2b5d10
+Revises: b2c84f6d0e17
+Create Date: 2026-10-19 11:40:07.529861
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '9c4e7a2b5d10'
+down_revision = 'b2c84f6d0e17'
+branch_labels = None
+depends_on = None
+
+
+def create_show_table(name):
+    op.create_table(name,
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('show_id', sa.Integer(), nullable=False),
+    sa.Column('start_time', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['artist_id'], ['Artist.id'], ),
+    sa.ForeignKeyConstraint(['show_id'], ['ShowTime.id'], ),
+    sa.ForeignKeyConstraint(['venue_id'], ['Venue.id'], ),
+    sa.PrimaryKeyConstraint('artist_id', 'venue_id', 'show_id', 'start_time'),
+    postgresql_partition_by='RANGE (start_time)'
+    )
+
+
+def upgrade():
+    op.rename_table('Show', 'Show_old')
+    op.execute('ALTER TABLE "Show_old" RENAME CONSTRAINT "Show_pkey" TO "Show_old_pkey"')
+
+    create_show_table('Show')
+    create_show_table('ShowArchive')
+
+    # one partition for every year that has shows, plus this year and the next
+    op.execute('''
+        DO $$
+        DECLARE y integer;
+        BEGIN
+            FOR y IN
+                SELECT DISTINCT extract(year FROM start_time)::integer FROM "ShowTime"
+                UNION SELECT extract(year FROM now())::integer
+                UNION SELECT extract(year FROM now())::integer + 1
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF "Show" FOR VALUES FROM (%L) TO (%L)',
+                    'Show_y' || y, make_date(y, 1, 1), make_date(y + 1, 1, 1));
+            END LOOP;
+        END $$
+    ''')
+
+    op.execute('''
+        INSERT INTO "Show" (artist_id, venue_id, show_id, start_time)
+        SELECT s.artist_id, s.venue_id, s.show_id, t.start_time
+        FROM "Show_old" s JOIN "ShowTime" t ON t.id = s.show_id
+    ''')
+    op.drop_table('Show_old')
+
+
+def downgrade():
+    op.create_table('Show_old',
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('show_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['artist_id'], ['Artist.id'], ),
+    sa.ForeignKeyConstraint(['show_id'], ['ShowTime.id'], ),
+    sa.ForeignKeyConstraint(['venue_id'], ['Venue.id'], ),
+    sa.PrimaryKeyConstraint('artist_id', 'venue_id', 'show_id', name='Show_old_pkey')
+    )
+    op.execute('''
+        INSERT INTO "Show_old" (artist_id, venue_id, show_id)
+        SELECT artist_id, venue_id, show_id FROM "Show"
+        UNION ALL
+        SELECT artist_id, venue_id, show_id FROM "ShowArchive"
+    ''')
+
+    # dropping the parents drops every partition with them
+    op.drop_table('ShowArchive')
+    op.drop_table('Show')
+    op.rename_table('Show_old', 'Show')
+    op.execute('ALTER TABLE "Show" RENAME CONSTRAINT "Show_old_pkey" TO "Show_pkey"')
@@ -0,0 +1,30 @@
+"""show created_at and schedule indexes
+
+Revision ID: a4f0c7e93b61
+Revises: 5b8d2f6e1a93
+Create Date: 2026-10-19 17:05:51.772390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a4f0c7e93b61'
+down_revision = '5b8d2f6e1a93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # both parents keep identical columns so partitions can move between them
+    for table in ('Show', 'ShowArchive'):
+        op.add_column(table, sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False))
+    op.create_index('ix_Show_venue_id_start_time', 'Show', ['venue_id', 'start_time'], unique=False)
+    op.create_index('ix_Show_artist_id_start_time', 'Show', ['artist_id', 'start_time'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_Show_artist_id_start_time', table_name='Show')
+    op.drop_index('ix_Show_venue_id_start_time', table_name='Show')
+    for table in ('Show', 'ShowArchive'):
+        op.drop_column(table, 'created_at')
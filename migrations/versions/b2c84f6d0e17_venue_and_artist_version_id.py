@@ -0,0 +1,26 @@
+"""venue and artist version_id
+
+Revision ID: b2c84f6d0e17
+Revises: 7d1e5a9b3c26
+Create Date: 2026-10-19 10:21:36.118943
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b2c84f6d0e17'
+down_revision = '7d1e5a9b3c26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # existing rows start at version 1, the same as new ones
+    for table in ('Venue', 'Artist'):
+        op.add_column(table, sa.Column('version_id', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    for table in ('Artist', 'Venue'):
+        op.drop_column(table, 'version_id')
@@ -0,0 +1,28 @@
+"""show created_at with time zone
+
+Revision ID: c5e9a1f3d7b8
+Revises: a4f0c7e93b61
+Create Date: 2026-10-19 18:42:10.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c5e9a1f3d7b8'
+down_revision = 'a4f0c7e93b61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # now() was stored in the server's time zone; keep the same instants
+    for table in ('Show', 'ShowArchive'):
+        op.alter_column(table, 'created_at', type_=sa.DateTime(timezone=True),
+                        postgresql_using="created_at AT TIME ZONE current_setting('TimeZone')")
+
+
+def downgrade():
+    for table in ('Show', 'ShowArchive'):
+        op.alter_column(table, 'created_at', type_=sa.DateTime(),
+                        postgresql_using="created_at AT TIME ZONE current_setting('TimeZone')")
@@ -0,0 +1,77 @@
+"""cascade show deletes and archive deleted rows
+
+Revision ID: e71b3d8a4c22
+Revises: 9c4e7a2b5d10
+Create Date: 2026-10-19 15:02:44.118203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e71b3d8a4c22'
+down_revision = '9c4e7a2b5d10'
+branch_labels = None
+depends_on = None
+
+SHOW_TABLES = ('Show', 'ShowArchive')
+ARCHIVED_TABLES = ('Venue', 'Artist', 'Show', 'ShowArchive')
+
+
+def foreign_key_names(table):
+    # the generated names vary (Show was rebuilt while Show_old still held
+    # the default ones), so look them up by column
+    rows = op.get_bind().execute(sa.text(
+        'SELECT a.attname, c.conname FROM pg_constraint c '
+        'JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = c.conkey[1] '
+        "WHERE c.conrelid = CAST(:table AS regclass) AND c.contype = 'f'"),
+        {'table': '"%s"' % table})
+    return dict(rows.fetchall())
+
+
+def replace_show_foreign_keys(ondelete):
+    # constraints on the partitioned parents are inherited by every partition
+    for table in SHOW_TABLES:
+        names = foreign_key_names(table)
+        for column, referent in (('artist_id', 'Artist'), ('venue_id', 'Venue')):
+            op.drop_constraint(names[column], table, type_='foreignkey')
+            op.create_foreign_key('%s_%s_fkey' % (table, column), table, referent,
+                                  [column], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    op.create_table('DeletedRecord',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('table_name', sa.String(length=64), nullable=False),
+    sa.Column('record', sa.JSON(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    replace_show_foreign_keys('CASCADE')
+
+    # statement level, so a bulk delete copies its rows with one INSERT;
+    # the policy is chosen per transaction with SET LOCAL fyyur.delete_policy
+    op.execute('''
+        CREATE FUNCTION archive_deleted_rows() RETURNS trigger AS $$
+        BEGIN
+            IF current_setting('fyyur.delete_policy', true) = 'archive' THEN
+                INSERT INTO "DeletedRecord" (table_name, record)
+                SELECT TG_TABLE_NAME, row_to_json(old_rows) FROM old_rows;
+            END IF;
+            RETURN NULL;
+        END $$ LANGUAGE plpgsql
+    ''')
+    for table in ARCHIVED_TABLES:
+        op.execute('CREATE TRIGGER "%s_archive_deleted" AFTER DELETE ON "%s" '
+                   'REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT '
+                   'EXECUTE FUNCTION archive_deleted_rows()' % (table, table))
+
+
+def downgrade():
+    for table in ARCHIVED_TABLES:
+        op.execute('DROP TRIGGER "%s_archive_deleted" ON "%s"' % (table, table))
+    op.execute('DROP FUNCTION archive_deleted_rows()')
+
+    replace_show_foreign_keys(None)
+    op.drop_table('DeletedRecord')
@@ -1,17 +1,21 @@
-from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
 from flask_moment import Moment
-from sqlalchemy.orm import backref
-from flask import Flask
+from cache import FileCache, MemoryCache
+from tasks import TaskQueue
+from throttle import SingleFlight, TokenBucketLimiter
+
 #----------------------------------------------------------------------------#
-# App Config.
+# Extensions.
 #----------------------------------------------------------------------------#
 
-app = Flask(__name__)
-moment = Moment(app)
-app.config.from_object('config')
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
+# bound to an application by create_app() in app.py
+db = SQLAlchemy()
+moment = Moment()
+task_queue = TaskQueue()
+page_cache = FileCache()
+search_cache = MemoryCache()
+search_limiter = TokenBucketLimiter()
+search_flight = SingleFlight()
 
 #----------------------------------------------------------------------------#
 # Models.
@@ -33,6 +37,10 @@ class Venue(db.Model):
     genres = db.Column(db.ARRAY(db.String), nullable=False)
     seeking_talent = db.Column(db.Boolean, nullable=False)
     seeking_description = db.Column(db.String(200))
+    created_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+    version_id = db.Column(db.Integer, nullable=False, server_default='1')
+
+    __mapper_args__ = {'version_id_col': version_id}
 
 
 class Artist(db.Model):
@@ -49,25 +57,83 @@ class Artist(db.Model):
     facebook_link = db.Column(db.String(120))
     seeking_venue = db.Column(db.Boolean, nullable=False)
     seeking_description = db.Column(db.String(200))
+    created_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+    version_id = db.Column(db.Integer, nullable=False, server_default='1')
+
+    __mapper_args__ = {'version_id_col': version_id}
 
 
 class Show(db.Model):
     __tablename__ = 'Show'
+    # one partition per calendar year of start_time, managed by partitions.py
+    __table_args__ = (
+        db.Index('ix_Show_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_Show_artist_id_start_time', 'artist_id', 'start_time'),
+        {'postgresql_partition_by': 'RANGE (start_time)'}
+    )
 
     artist_id = db.Column(db.Integer, db.ForeignKey(
-        'Artist.id'), primary_key=True)
+        'Artist.id', ondelete='CASCADE'), primary_key=True)
     venue_id = db.Column(db.Integer, db.ForeignKey(
-        'Venue.id'), primary_key=True)
+        'Venue.id', ondelete='CASCADE'), primary_key=True)
     show_id = db.Column(db.Integer, db.ForeignKey(
         'ShowTime.id'), primary_key=True)
+    start_time = db.Column(db.DateTime, primary_key=True)
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=db.func.now())
 
-    artist = db.relationship('Artist', backref=db.backref('artists'))
-    venue = db.relationship('Venue', backref=db.backref('venues'))
+    artist = db.relationship('Artist', backref=db.backref('artists', passive_deletes=True))
+    venue = db.relationship('Venue', backref=db.backref('venues', passive_deletes=True))
     show_time = db.relationship('ShowTime')
 
 
+class ShowArchive(db.Model):
+    __tablename__ = 'ShowArchive'
+    # yearly partitions detached from Show by `flask shows archive`
+    __table_args__ = {'postgresql_partition_by': 'RANGE (start_time)'}
+
+    artist_id = db.Column(db.Integer, db.ForeignKey(
+        'Artist.id', ondelete='CASCADE'), primary_key=True)
+    venue_id = db.Column(db.Integer, db.ForeignKey(
+        'Venue.id', ondelete='CASCADE'), primary_key=True)
+    show_id = db.Column(db.Integer, db.ForeignKey(
+        'ShowTime.id'), primary_key=True)
+    start_time = db.Column(db.DateTime, primary_key=True)
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=db.func.now())
+
+
+class DeletedRecord(db.Model):
+    __tablename__ = 'DeletedRecord'
+    # filled by database triggers when DELETE_POLICY is 'archive'
+
+    id = db.Column(db.Integer, primary_key=True)
+    table_name = db.Column(db.String(64), nullable=False)
+    record = db.Column(db.JSON, nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+
+
 class ShowTime(db.Model):
     __tablename__ = 'ShowTime'
 
     id = db.Column(db.Integer, primary_key=True)
     start_time = db.Column(db.DateTime, nullable=False)
+
+
+class Ranking(db.Model):
+    __tablename__ = 'Ranking'
+    # rebuilt wholesale by rankings.refresh(); name and image are copied in
+    # so the home page never has to join back to Artist or Venue
+
+    kind = db.Column(db.String(32), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)
+    entity_id = db.Column(db.Integer, nullable=False)
+    name = db.Column(db.String, nullable=False)
+    image_link = db.Column(db.String(500))
+    score = db.Column(db.Float, nullable=False)
+    computed_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+
+
+class Thumbnail(db.Model):
+    __tablename__ = 'Thumbnail'
+
+    source_url = db.Column(db.String(500), primary_key=True)
+    digest = db.Column(db.String(64), nullable=False)
@@ -0,0 +1,88 @@
+from datetime import datetime
+from models import db, Show, ShowArchive
+
+#----------------------------------------------------------------------------#
+# Show partitions.
+#----------------------------------------------------------------------------#
+
+# "Show" is range partitioned by calendar year of start_time into Show_y<year>
+# tables. `flask shows archive` moves old years, whole partitions at a time,
+# under "ShowArchive" as ShowArchive_y<year>, optionally onto a slower
+# tablespace. Upcoming-show queries only ever read "Show", and Postgres prunes
+# them down to the current and future years.
+
+
+def _execute(statement, **params):
+    return db.session.execute(db.text(statement), params)
+
+
+def _partition_years(parent):
+    rows = _execute(
+        'SELECT child.relname FROM pg_inherits '
+        'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+        'JOIN pg_class parent ON parent.oid = pg_inherits.inhparent '
+        'WHERE parent.relname = :parent', parent=parent)
+    return sorted(int(name.rsplit('_y', 1)[1]) for name, in rows)
+
+
+def live_years():
+    return _partition_years('Show')
+
+
+def archived_years():
+    return _partition_years('ShowArchive')
+
+
+def _bounds(year):
+    return "FOR VALUES FROM ('%d-01-01') TO ('%d-01-01')" % (year, year + 1)
+
+
+def ensure_partition(year):
+    # runs before every show insert. Nothing is cached per process: another
+    # process may have archived the year since, and IF NOT EXISTS already
+    # makes the statement a no-op when the partition is there.
+    _execute('CREATE TABLE IF NOT EXISTS "Show_y%d" PARTITION OF "Show" %s'
+             % (year, _bounds(year)))
+    db.session.commit()
+
+
+def ensure_partitions(ahead):
+    this_year = datetime.now().year
+    for year in range(this_year, this_year + ahead + 1):
+        ensure_partition(year)
+
+
+def archive_partitions(before, tablespace=None):
+    archived = []
+    already_archived = set(archived_years())
+
+    for year in live_years():
+        if year >= before:
+            continue
+
+        _execute('ALTER TABLE "Show" DETACH PARTITION "Show_y%d"' % year)
+        if year in already_archived:
+            # shows were added to a year that had been archived before
+            _execute('INSERT INTO "ShowArchive" SELECT * FROM "Show_y%d"' % year)
+            _execute('DROP TABLE "Show_y%d"' % year)
+        else:
+            _execute('ALTER TABLE "Show_y%d" RENAME TO "ShowArchive_y%d"'
+                     % (year, year))
+            if tablespace:
+                _execute('ALTER TABLE "ShowArchive_y%d" SET TABLESPACE "%s"'
+                         % (year, tablespace))
+            _execute('ALTER TABLE "ShowArchive" ATTACH PARTITION "ShowArchive_y%d" %s'
+                     % (year, _bounds(year)))
+
+        archived.append(year)
+
+    db.session.commit()
+    return archived
+
+
+def all_shows():
+    # live and archived shows as one selectable, for anything about the past
+    return db.union_all(
+        db.select([Show.artist_id, Show.venue_id, Show.start_time]),
+        db.select([ShowArchive.artist_id, ShowArchive.venue_id, ShowArchive.start_time])
+    ).alias('all_shows')
@@ -0,0 +1,211 @@
+import functools
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from flask import current_app, g, has_app_context, request
+from jinja2 import Template
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from sqlalchemy import event
+
+#----------------------------------------------------------------------------#
+# Request profiling.
+#----------------------------------------------------------------------------#
+
+# A request is profiled when PROFILING_ENABLED is set, or when it carries a
+# PROFILE_HEADER holding a token from `flask profile token`. Each profiled
+# request leaves two files in PROFILE_DIR:
+#   <id>.prof or <id>.html   cProfile stats (open with pstats or snakeviz)
+#                            or a pyinstrument report
+#   <id>.json                wall time split into SQL, every render_template
+#                            call and every template filter
+# Unprofiled requests only pay for one lookup on ``g`` per filter call and
+# per query.
+
+
+def _current():
+    return g.get('profile') if has_app_context() else None
+
+
+class TimedTemplate(Template):
+
+    def render(self, *args, **kwargs):
+        profile = _current()
+        if profile is None:
+            return super(TimedTemplate, self).render(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return super(TimedTemplate, self).render(*args, **kwargs)
+        finally:
+            profile['templates'].append(
+                {'name': self.name, 'time': time.perf_counter() - start})
+
+
+def _timed_filter(name, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profile = _current()
+        if profile is None:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats = profile['filters'].setdefault(name, {'calls': 0, 'time': 0.0})
+            stats['calls'] += 1
+            stats['time'] += time.perf_counter() - start
+    return wrapper
+
+
+class Profiler(object):
+    """Opt-in per-request profiles written to PROFILE_DIR."""
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._engines = set()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PROFILING_ENABLED', False)
+        app.config.setdefault('PROFILE_DIR', os.path.join(app.instance_path, 'profiles'))
+        app.config.setdefault('PROFILE_HEADER', 'X-Profile')
+        app.config.setdefault('PROFILE_TOKEN_MAX_AGE', 3600)
+        app.config.setdefault('PROFILER', 'cprofile')
+        self.app = app
+        app.extensions['profiler'] = self
+
+        # filters registered after this point are not timed, so this runs
+        # at the end of create_app
+        env = app.jinja_env
+        env.template_class = TimedTemplate
+        for name, func in list(env.filters.items()):
+            env.filters[name] = _timed_filter(name, func)
+
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._stop)
+
+    #  Tokens
+    #  ----------------------------------------------------------------
+
+    def _serializer(self):
+        return URLSafeTimedSerializer(self.app.secret_key, salt='profile')
+
+    def token(self):
+        return self._serializer().dumps('profile')
+
+    def _requested(self):
+        if self.app.config['PROFILING_ENABLED']:
+            return True
+        token = request.headers.get(self.app.config['PROFILE_HEADER'])
+        if not token:
+            return False
+        try:
+            self._serializer().loads(token, max_age=self.app.config['PROFILE_TOKEN_MAX_AGE'])
+        except BadSignature:
+            return False
+        return True
+
+    #  Profiling
+    #  ----------------------------------------------------------------
+
+    def _watch_engine(self):
+        from models import db
+        engine = db.engine
+        with self._lock:
+            if engine in self._engines:
+                return
+            self._engines.add(engine)
+
+        @event.listens_for(engine, 'before_cursor_execute')
+        def before(conn, cursor, statement, parameters, context, executemany):
+            profile = _current()
+            if profile is not None:
+                profile['_query_start'] = time.perf_counter()
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def after(conn, cursor, statement, parameters, context, executemany):
+            profile = _current()
+            if profile is not None and '_query_start' in profile:
+                profile['sql']['count'] += 1
+                profile['sql']['time'] += time.perf_counter() - profile.pop('_query_start')
+
+    def _new_profiler(self):
+        if self.app.config['PROFILER'] == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler as Pyinstrument
+                return Pyinstrument()
+            except ImportError:
+                self.app.logger.warning('pyinstrument is not installed, using cProfile')
+        import cProfile
+        return cProfile.Profile()
+
+    def _start(self):
+        if not self._requested():
+            return
+        self._watch_engine()
+        g.profile = {
+            'templates': [],
+            'filters': {},
+            'sql': {'count': 0, 'time': 0.0},
+            'started': time.perf_counter(),
+            'profiler': self._new_profiler()
+        }
+        self._begin(g.profile['profiler'])
+
+    def _stop(self, error=None):
+        profile = g.pop('profile', None)
+        if profile is not None:
+            self._halt(profile['profiler'])
+        return profile
+
+    def _begin(self, profiler):
+        if hasattr(profiler, 'enable'):
+            profiler.enable()
+        else:
+            profiler.start()
+
+    def _halt(self, profiler):
+        if hasattr(profiler, 'disable'):
+            profiler.disable()
+        elif profiler.is_running:
+            profiler.stop()
+
+    def _finish(self, response):
+        profile = self._stop()
+        if profile is None:
+            return response
+
+        total = time.perf_counter() - profile['started']
+        slug = re.sub(r'[^A-Za-z0-9]+', '-', request.path).strip('-') or 'index'
+        profile_id = '%s-%s-%s' % (datetime.now().strftime('%Y%m%d-%H%M%S-%f'),
+                                   request.method.lower(), slug)
+        directory = current_app.config['PROFILE_DIR']
+        os.makedirs(directory, exist_ok=True)
+
+        profiler = profile['profiler']
+        if hasattr(profiler, 'dump_stats'):
+            profiler.dump_stats(os.path.join(directory, profile_id + '.prof'))
+        else:
+            with open(os.path.join(directory, profile_id + '.html'), 'w') as f:
+                f.write(profiler.output_html())
+
+        with open(os.path.join(directory, profile_id + '.json'), 'w') as f:
+            json.dump({
+                'method': request.method,
+                'path': request.full_path,
+                'status': response.status_code,
+                'total': total,
+                'sql': profile['sql'],
+                'templates': profile['templates'],
+                'filters': profile['filters']
+            }, f, indent=2)
+
+        response.headers['X-Profile-Id'] = profile_id
+        return response
+
+
+profiler = Profiler()
@@ -0,0 +1,114 @@
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from models import db, Artist, Ranking, Show, Venue
+
+#----------------------------------------------------------------------------#
+# Home page rankings.
+#----------------------------------------------------------------------------#
+
+# Each refresh replaces the whole Ranking table with four short lists:
+#   popular_artist, popular_venue  bookings in a window around now, with
+#                                  upcoming shows counting double
+#   recent_artist, recent_venue    newest listings first
+# Every list is computed by one aggregate query inside Postgres and copied
+# over with INSERT ... SELECT, so no rows are loaded into Python. Venue,
+# artist and show writes request a refresh, and writes in quick succession
+# share one (see request_refresh).
+
+RANKED = {'artist': (Artist, Show.artist_id), 'venue': (Venue, Show.venue_id)}
+
+_lock = threading.Lock()
+_scheduled = False
+
+
+def _popular(kind, model, column, now, config):
+    bookings = db.session.query(
+        column.label('entity_id'),
+        db.func.count().filter(Show.start_time < now).label('past'),
+        db.func.count().filter(Show.start_time >= now).label('upcoming')
+    ).filter(
+        Show.start_time >= now - timedelta(days=config['RANKING_PAST_DAYS']),
+        Show.start_time < now + timedelta(days=config['RANKING_UPCOMING_DAYS'])
+    ).group_by(column).subquery()
+
+    score = bookings.c.upcoming * 2 + bookings.c.past
+    order = (score.desc(), model.id)
+    return db.select([
+        db.literal('popular_' + kind), db.func.row_number().over(order_by=order),
+        model.id, model.name, model.image_link, score
+    ]).select_from(model).join(bookings, bookings.c.entity_id == model.id) \
+        .order_by(*order).limit(config['RANKING_SIZE'])
+
+
+def _recent(kind, model, config):
+    order = (model.created_at.desc(), model.id.desc())
+    return db.select([
+        db.literal('recent_' + kind), db.func.row_number().over(order_by=order),
+        model.id, model.name, model.image_link, db.func.extract('epoch', model.created_at)
+    ]).order_by(*order).limit(config['RANKING_SIZE'])
+
+
+def refresh():
+    config = current_app.config
+    now = datetime.now()
+    columns = ['kind', 'rank', 'entity_id', 'name', 'image_link', 'score']
+
+    # concurrent refreshes queue up here; readers are never blocked and
+    # keep seeing the previous lists until the commit
+    db.session.execute(db.text('LOCK TABLE "Ranking" IN EXCLUSIVE MODE'))
+    db.session.execute(Ranking.__table__.delete())
+    for kind, (model, column) in RANKED.items():
+        for select in (_popular(kind, model, column, now, config), _recent(kind, model, config)):
+            db.session.execute(Ranking.__table__.insert().from_select(columns, select))
+    db.session.commit()
+    return Ranking.query.count()
+
+
+def top(size):
+    rankings = {}
+    for row in Ranking.query.filter(Ranking.rank <= size).order_by(Ranking.kind, Ranking.rank):
+        rankings.setdefault(row.kind, []).append(row)
+    if not rankings:
+        # never refreshed, e.g. on a fresh deploy
+        request_refresh()
+    return rankings
+
+
+def _scheduled_refresh():
+    global _scheduled
+    # cleared first, so writes made during the refresh request another one
+    with _lock:
+        _scheduled = False
+    refresh()
+
+
+def request_refresh(entity_id=None):
+    # post-write hook for venues, artists and shows. At most one refresh is
+    # pending per process; it runs RANKING_REFRESH_DELAY seconds after the
+    # first request, so a bulk delete (one job per id) refreshes once.
+    global _scheduled
+    with _lock:
+        if _scheduled:
+            return
+        _scheduled = True
+
+    delay = current_app.config.get('RANKING_REFRESH_DELAY', 10)
+    tasks = current_app.extensions['tasks']
+    if not delay:
+        tasks.enqueue(_scheduled_refresh)
+        return
+    timer = threading.Timer(delay, tasks.enqueue, [_scheduled_refresh])
+    timer.daemon = True
+    timer.start()
+
+
+def schedule_refresh(tasks, interval):
+    # every worker process keeps its own timer; prefer running
+    # `flask rankings refresh` from cron when there are many workers
+    def tick():
+        tasks.enqueue(refresh)
+        timer = threading.Timer(interval, tick)
+        timer.daemon = True
+        timer.start()
+    tick()
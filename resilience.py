@@ -0,0 +1,137 @@
+import random
+import threading
+import time
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.pool import Pool
+from models import db
+
+#----------------------------------------------------------------------------#
+# Database resilience.
+#----------------------------------------------------------------------------#
+
+# Pooled connections are pinged before use (SQLALCHEMY_ENGINE_OPTIONS in
+# config.py), so a restarted Postgres costs one reconnect instead of an
+# error. When connecting keeps failing, the circuit breaker opens and new
+# connections are refused immediately with DatabaseUnavailable (a 503),
+# rather than every worker waiting on connect timeouts. After
+# DB_BREAKER_RESET seconds, one connection attempt is let through. If it
+# succeeds, the breaker closes again.
+
+
+class DatabaseUnavailable(Exception):
+    pass
+
+
+class CircuitBreaker(object):
+    """Counts consecutive connection failures across all engines."""
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.threshold = 5
+        self.reset_after = 30
+        self._listening = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('DB_BREAKER_THRESHOLD', 5)
+        app.config.setdefault('DB_BREAKER_RESET', 30)
+        app.config.setdefault('DB_READ_RETRIES', 2)
+        app.config.setdefault('DB_RETRY_DELAY', 0.1)
+        self.threshold = app.config['DB_BREAKER_THRESHOLD']
+        self.reset_after = app.config['DB_BREAKER_RESET']
+        app.extensions['circuit_breaker'] = self
+
+        # class level, so engines created later are covered too
+        if not self._listening:
+            event.listen(Engine, 'do_connect', self._before_connect)
+            event.listen(Engine, 'handle_error', self._on_error)
+            event.listen(Pool, 'checkout', self._on_checkout)
+            self._listening = True
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if time.time() - self.opened_at >= self.reset_after:
+                # one trial connection per reset period
+                self.state = self.HALF_OPEN
+                self.opened_at = time.time()
+                return True
+            return False
+
+    def retry_after(self):
+        if self.opened_at is None:
+            return 0
+        return max(1, int(self.reset_after - (time.time() - self.opened_at)))
+
+    def record_success(self):
+        if self.state == self.CLOSED and not self.failures:
+            return
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                self.state = self.OPEN
+                self.opened_at = time.time()
+
+    def _before_connect(self, dialect, conn_rec, cargs, cparams):
+        if not self.allow():
+            raise DatabaseUnavailable('database circuit breaker is open')
+
+    def _on_error(self, context):
+        if context.is_disconnect or isinstance(context.sqlalchemy_exception, OperationalError):
+            self.record_failure()
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.record_success()
+
+    def status(self):
+        return {
+            'state': self.state,
+            'failures': self.failures,
+            'retry_after': self.retry_after() if self.state != self.CLOSED else 0
+        }
+
+
+circuit_breaker = CircuitBreaker()
+
+
+def retry_read(read):
+    # only for idempotent reads: a dropped connection is retried a couple of
+    # times with full jitter, so workers that lost their connections at the
+    # same moment do not reconnect in lockstep
+    retries = current_app.config['DB_READ_RETRIES']
+    delay = current_app.config['DB_RETRY_DELAY']
+
+    for attempt in range(retries + 1):
+        try:
+            return read()
+        except DBAPIError as e:
+            transient = e.connection_invalidated or isinstance(e, OperationalError)
+            if not transient or attempt == retries or circuit_breaker.state == CircuitBreaker.OPEN:
+                raise
+            db.session.rollback()
+            time.sleep(random.uniform(0, delay * 2 ** attempt))
+
+
+def pool_status(engine):
+    pool = engine.pool
+    status = {'class': type(pool).__name__}
+    for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+        if hasattr(pool, name):
+            status[name] = getattr(pool, name)()
+    return status
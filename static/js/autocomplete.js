@@ -0,0 +1,54 @@
+// Debounced typeahead for inputs marked with data-autocomplete="<url>".
+// Suggestions are shown through the input's <datalist>; picking one copies
+// its id into the field named by data-target.
+(function () {
+  var DELAY = 150;
+
+  Array.prototype.forEach.call(document.querySelectorAll('[data-autocomplete]'), function (input) {
+    var list = document.getElementById(input.getAttribute('list'));
+    var target = document.getElementById(input.getAttribute('data-target'));
+    var timer = null;
+    var last = null;
+
+    function pick() {
+      var options = list.getElementsByTagName('option');
+      for (var i = 0; i < options.length; i++) {
+        if (options[i].value === input.value) {
+          target.value = options[i].getAttribute('data-id');
+          return true;
+        }
+      }
+      return false;
+    }
+
+    input.addEventListener('input', function () {
+      if (pick()) {
+        return;
+      }
+      clearTimeout(timer);
+      timer = setTimeout(function () {
+        var q = input.value.trim();
+        if (!q || q === last) {
+          return;
+        }
+        last = q;
+        fetch(input.getAttribute('data-autocomplete') + '?q=' + encodeURIComponent(q))
+          .then(function (response) { return response.json(); })
+          .then(function (results) {
+            // ignore responses that arrive after the user kept typing
+            if (input.value.trim() !== q) {
+              return;
+            }
+            list.innerHTML = '';
+            results.forEach(function (item) {
+              var option = document.createElement('option');
+              option.value = item.name;
+              option.textContent = 'ID ' + item.id;
+              option.setAttribute('data-id', item.id);
+              list.appendChild(option);
+            });
+          });
+      }, DELAY);
+    });
+  });
+})();
@@ -0,0 +1,187 @@
+import logging
+import queue
+import threading
+import time
+from collections import deque
+
+#----------------------------------------------------------------------------#
+# Background tasks.
+#----------------------------------------------------------------------------#
+
+logger = logging.getLogger(__name__)
+
+
+class Job(object):
+
+    def __init__(self, func, args, kwargs):
+        self.func = func
+        self.name = getattr(func, '__name__', repr(func))
+        self.args = args
+        self.kwargs = kwargs
+        self.attempts = 0
+        self.status = 'queued'
+        self.error = None
+        self.enqueued_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def wait_time(self):
+        if self.started_at is None:
+            return None
+        return self.started_at - self.enqueued_at
+
+    @property
+    def run_time(self):
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+
+class TaskQueue(object):
+    """In-process worker pool for follow-up work that should not block a request.
+
+    Jobs run inside an application context, so they can use ``db.session``
+    like any view. Failed jobs are retried with exponential backoff up to
+    ``TASK_MAX_RETRIES`` times. Setting ``TASK_EAGER`` runs jobs inline,
+    which is handy from the shell and in tests.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._queue = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        self._post_write = {}
+        self._recent = deque(maxlen=50)
+        self._counts = {'completed': 0, 'failed': 0, 'retried': 0}
+        self._running = 0
+        self._total_wait = 0.0
+        self._total_run = 0.0
+        self._max_run = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('TASK_WORKERS', 2)
+        app.config.setdefault('TASK_MAX_RETRIES', 3)
+        app.config.setdefault('TASK_RETRY_DELAY', 1.0)
+        app.config.setdefault('TASK_EAGER', False)
+        self.app = app
+        app.extensions['tasks'] = self
+
+    #  Enqueueing
+    #  ----------------------------------------------------------------
+
+    def enqueue(self, func, *args, **kwargs):
+        job = Job(func, args, kwargs)
+        if self.app.config['TASK_EAGER']:
+            self._run(job)
+            return job
+        self._start_workers()
+        self._queue.put(job)
+        return job
+
+    def post_write(self, kind):
+        # decorator registering a job to run after an entity of `kind` is written
+        def decorator(func):
+            jobs = self._post_write.setdefault(kind, [])
+            if func not in jobs:
+                jobs.append(func)
+            return func
+        return decorator
+
+    def enqueue_post_write(self, kind, entity_id):
+        return [self.enqueue(func, entity_id)
+                for func in self._post_write.get(kind, [])]
+
+    #  Workers
+    #  ----------------------------------------------------------------
+
+    def _start_workers(self):
+        # workers are started on first use so that CLI commands such as
+        # `flask db upgrade` never spin up threads
+        if self._workers:
+            return
+        with self._lock:
+            if self._workers:
+                return
+            for i in range(self.app.config['TASK_WORKERS']):
+                worker = threading.Thread(
+                    target=self._work, name='fyyur-task-%d' % i, daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self._run(job)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job):
+        job.attempts += 1
+        job.status = 'running'
+        job.started_at = time.time()
+        with self._lock:
+            self._running += 1
+        try:
+            with self.app.app_context():
+                job.func(*job.args, **job.kwargs)
+        except Exception as e:
+            job.error = repr(e)
+            if job.attempts <= self.app.config['TASK_MAX_RETRIES']:
+                self._retry(job)
+            else:
+                logger.exception('Task %s failed after %d attempts',
+                                 job.name, job.attempts)
+                self._finish(job, 'failed')
+        else:
+            job.error = None
+            self._finish(job, 'completed')
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def _retry(self, job):
+        delay = self.app.config['TASK_RETRY_DELAY'] * 2 ** (job.attempts - 1)
+        job.status = 'retrying'
+        with self._lock:
+            self._counts['retried'] += 1
+        if self.app.config['TASK_EAGER']:
+            time.sleep(delay)
+            self._run(job)
+            return
+        timer = threading.Timer(delay, self._queue.put, [job])
+        timer.daemon = True
+        timer.start()
+
+    def _finish(self, job, status):
+        job.status = status
+        job.finished_at = time.time()
+        with self._lock:
+            self._counts[status] += 1
+            self._total_wait += job.wait_time
+            self._total_run += job.run_time
+            self._max_run = max(self._max_run, job.run_time)
+            self._recent.appendleft(job)
+
+    #  Introspection
+    #  ----------------------------------------------------------------
+
+    def stats(self):
+        with self._lock:
+            finished = self._counts['completed'] + self._counts['failed']
+            return {
+                'depth': self._queue.qsize(),
+                'workers': len(self._workers),
+                'running': self._running,
+                'completed': self._counts['completed'],
+                'failed': self._counts['failed'],
+                'retried': self._counts['retried'],
+                'avg_wait': self._total_wait / finished if finished else 0.0,
+                'avg_run': self._total_run / finished if finished else 0.0,
+                'max_run': self._max_run,
+                'recent': list(self._recent),
+            }
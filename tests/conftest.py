@@ -0,0 +1,234 @@
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine.url import make_url
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+#----------------------------------------------------------------------------#
+# Test database.
+#----------------------------------------------------------------------------#
+
+# The suite runs against a database of its own, created on the server in
+# TEST_DATABASE_URL when that is set, or on a throwaway cluster started with
+# initdb/pg_ctl from PATH otherwise. It is migrated with migrations/, so
+# partitions, cascades and triggers are the real ones, and dropped at the end.
+
+# fixed data size the performance budgets are measured against
+VENUES = 50
+ARTISTS = 200
+SHOWS = 2000
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture(scope='session')
+def postgres_url(tmp_path_factory):
+    url = os.environ.get('TEST_DATABASE_URL')
+    if url:
+        yield url
+        return
+
+    initdb, pg_ctl = shutil.which('initdb'), shutil.which('pg_ctl')
+    if not (initdb and pg_ctl):
+        pytest.fail('set TEST_DATABASE_URL or put initdb and pg_ctl on PATH')
+    if hasattr(os, 'geteuid') and os.geteuid() == 0:
+        pytest.fail('Postgres refuses to run as root; set TEST_DATABASE_URL')
+
+    data = str(tmp_path_factory.mktemp('pgdata'))
+    port = _free_port()
+    subprocess.run([initdb, '-D', data, '-U', 'postgres', '--auth=trust', '-E', 'UTF8'],
+                   check=True, stdout=subprocess.DEVNULL)
+    subprocess.run([pg_ctl, '-D', data, '-w', '-l', os.path.join(data, 'postgres.log'),
+                    '-o', "-p %d -k %s -c listen_addresses='' -c fsync=off" % (port, data), 'start'],
+                   check=True, stdout=subprocess.DEVNULL)
+    try:
+        yield 'postgresql://postgres@/postgres?host=%s&port=%d' % (data, port)
+    finally:
+        subprocess.run([pg_ctl, '-D', data, '-w', '-m', 'immediate', 'stop'],
+                       stdout=subprocess.DEVNULL)
+
+
+@pytest.fixture(scope='session')
+def database_url(postgres_url):
+    name = 'fyyur_test_%s' % uuid.uuid4().hex[:8]
+    server = create_engine(postgres_url, isolation_level='AUTOCOMMIT')
+    with server.connect() as conn:
+        conn.exec_driver_sql('CREATE DATABASE "%s"' % name)
+    try:
+        yield str(make_url(postgres_url).set(database=name))
+    finally:
+        with server.connect() as conn:
+            conn.exec_driver_sql('DROP DATABASE IF EXISTS "%s"' % name)
+        server.dispose()
+
+
+#----------------------------------------------------------------------------#
+# App.
+#----------------------------------------------------------------------------#
+
+@pytest.fixture(scope='session')
+def app(database_url, tmp_path_factory):
+    from flask_migrate import Migrate, upgrade
+    from app import create_app
+    from models import db
+
+    tmp = tmp_path_factory.mktemp('instance')
+    app = create_app(
+        SQLALCHEMY_DATABASE_URI=database_url,
+        TESTING=True,
+        WTF_CSRF_ENABLED=False,
+        # post-write jobs run inline and give up on the first failure
+        TASK_EAGER=True,
+        TASK_MAX_RETRIES=0,
+        CACHE_DIR=str(tmp / 'cache'),
+        THUMBNAIL_DIR=str(tmp / 'thumbs'),
+        PROFILE_DIR=str(tmp / 'profiles'),
+        SEARCH_RATE_BURST=10000,
+        # rankings refresh inline after every write
+        RANKING_REFRESH_DELAY=0,
+        # as on Heroku: one router in front of the app
+        PROXY_COUNT=1,
+        ADMIN_PASSWORD='admin-secret',
+        DB_READ_RETRIES=0
+    )
+
+    with app.app_context():
+        Migrate(app, db)
+        upgrade(directory=os.path.join(ROOT, 'migrations'))
+        app.config['SEED'] = seed_database()
+        db.session.remove()
+
+    yield app
+
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture(scope='session')
+def seed(app):
+    return app.config['SEED']
+
+
+@pytest.fixture
+def client(app):
+    from models import page_cache, search_cache
+    # every test starts from cold caches
+    with app.app_context():
+        page_cache.invalidate()
+    search_cache.clear()
+    return app.test_client()
+
+
+@pytest.fixture
+def app_context(app):
+    with app.app_context():
+        yield
+
+
+@pytest.fixture
+def count_queries(app):
+    """Counts the SQL statements sent while the block runs."""
+    from models import db
+
+    @contextmanager
+    def counter():
+        statements = []
+
+        def before(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', before)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', before)
+    return counter
+
+
+#----------------------------------------------------------------------------#
+# Seed data.
+#----------------------------------------------------------------------------#
+
+def seed_database():
+    """Inserts VENUES venues, ARTISTS artists and SHOWS shows.
+
+    The first three venues and artists are the sample ones from the project
+    brief and get a handful of hand-placed shows, so their past and upcoming
+    splits are known exactly. The rest are shuffled deterministically between
+    generic venues and artists, two years back to one year ahead.
+    """
+    from models import db, Artist, Show, ShowTime, Venue
+    from partitions import ensure_partition
+
+    now = datetime.now().replace(microsecond=0)
+    rng = random.Random(2021)
+
+    venue_names = ['The Musical Hop', 'The Dueling Pianos Bar', 'Park Square Live Music & Coffee']
+    venue_names += ['Room %03d' % i for i in range(len(venue_names) + 1, VENUES + 1)]
+    artist_names = ['Guns N Petals', 'Matt Quevedo', 'The Wild Sax Band']
+    artist_names += ['Performer %03d' % i for i in range(len(artist_names) + 1, ARTISTS + 1)]
+
+    db.session.execute(Venue.__table__.insert(), [{
+        'id': i, 'name': name, 'city': ('San Francisco', 'New York', 'Austin')[i % 3],
+        'state': ('CA', 'NY', 'TX')[i % 3], 'address': '%d Folsom Street' % i,
+        'phone': '123-123-%04d' % i, 'genres': ['Jazz', 'Folk'], 'seeking_talent': i % 2 == 0
+    } for i, name in enumerate(venue_names, 1)])
+    db.session.execute(Artist.__table__.insert(), [{
+        'id': i, 'name': name, 'city': ('San Francisco', 'New York', 'Austin')[i % 3],
+        'state': ('CA', 'NY', 'TX')[i % 3], 'phone': '326-123-%04d' % i,
+        'genres': ['Rock n Roll'], 'seeking_venue': i % 2 == 1
+    } for i, name in enumerate(artist_names, 1)])
+
+    hop, pianos, park = 1, 2, 3
+    petals, quevedo, sax = 1, 2, 3
+    shows = [
+        (hop, petals, now - timedelta(days=400)),
+        (hop, quevedo, now - timedelta(days=3)),
+        (hop, sax, now + timedelta(days=7)),
+        (hop, sax, now + timedelta(days=30)),
+        (park, petals, now + timedelta(days=14)),
+        (park, quevedo, now - timedelta(days=60)),
+    ]
+    while len(shows) < SHOWS:
+        start = now + timedelta(hours=rng.randint(-2 * 365 * 24, 365 * 24))
+        shows.append((rng.randint(4, VENUES), rng.randint(4, ARTISTS), start))
+
+    for year in sorted(set(start.year for _, _, start in shows)):
+        ensure_partition(year)
+
+    db.session.execute(ShowTime.__table__.insert(), [
+        {'id': i, 'start_time': start} for i, (_, _, start) in enumerate(shows, 1)])
+    db.session.execute(Show.__table__.insert(), [
+        {'venue_id': venue_id, 'artist_id': artist_id, 'show_id': i, 'start_time': start}
+        for i, (venue_id, artist_id, start) in enumerate(shows, 1)])
+
+    for table in ('Venue', 'Artist', 'ShowTime'):
+        db.session.execute(db.text(
+            "SELECT setval(pg_get_serial_sequence('\"%s\"', 'id'), max(id)) FROM \"%s\"" % (table, table)))
+    db.session.commit()
+
+    return SimpleNamespace(
+        now=now, shows=shows,
+        hop=hop, pianos=pianos, park=park,
+        petals=petals, quevedo=quevedo, sax=sax,
+        generic_venue=4, generic_artist=4
+    )
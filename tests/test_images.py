@@ -0,0 +1,46 @@
+import io
+import os
+import re
+import pytest
+from images import THUMBNAIL_SIZES, fetch_url, thumbnails
+
+
+@pytest.mark.parametrize('url', [
+    'http://127.0.0.1/img.png',
+    'http://localhost/img.png',
+    'http://169.254.169.254/latest/meta-data/',
+    'http://10.0.0.1/img.png',
+    'https://192.168.1.1/img.png',
+    'http://[::1]/img.png',
+    'http://[::ffff:127.0.0.1]/img.png',
+    'http://0.0.0.0/img.png',
+])
+def test_fetch_refuses_non_public_hosts(url):
+    with pytest.raises(ValueError, match='non-public address'):
+        fetch_url(url)
+
+
+def test_fetch_refuses_other_schemes():
+    with pytest.raises(ValueError, match='non-HTTP'):
+        fetch_url('file:///etc/passwd')
+
+
+def image_bytes(size):
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def test_thumbnails_refuse_oversized_images(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'THUMBNAIL_MAX_PIXELS', 100 * 100)
+    with pytest.raises(ValueError, match='too large'):
+        thumbnails._generate(image_bytes((101, 100)))
+
+
+def test_thumbnails_leave_no_temporary_files(app):
+    digest = thumbnails._generate(image_bytes((40, 30)))
+    names = set(os.listdir(app.config['THUMBNAIL_DIR']))
+    assert names.issuperset('%s-%s.%s' % (digest, size, ext)
+                            for size in THUMBNAIL_SIZES for ext in ('webp', 'jpg'))
+    assert all(re.match(r'^[0-9a-f]{32}-[a-z]+\.(webp|jpg)$', name) for name in names), names
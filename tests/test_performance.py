@@ -0,0 +1,66 @@
+import time
+import pytest
+
+#----------------------------------------------------------------------------#
+# Performance budgets.
+#----------------------------------------------------------------------------#
+
+# Every route is requested with cold page and search caches against the
+# seeded data (VENUES/ARTISTS/SHOWS in conftest.py). A route fails when it
+# sends more than `statements` SQL statements, or when the fastest of
+# RUNS requests takes longer than `seconds`. Statement counts do not depend
+# on the machine, so they are tight; wall times leave room for slow CI.
+
+RUNS = 3
+
+BUDGETS = [
+    # method, path, statements, seconds
+    ('GET', '/', 1, 0.25),
+    ('GET', '/venues', 1, 0.25),
+    ('GET', '/artists', 1, 0.25),
+    ('GET', '/shows', 1, 1.0),
+    ('GET', '/venues/{hop}', 3, 0.25),
+    ('GET', '/artists/{sax}', 3, 0.25),
+    ('GET', '/venues/{generic_venue}', 3, 0.25),
+    ('GET', '/artists/{generic_artist}', 3, 0.25),
+    ('POST', '/venues/search', 1, 0.25),
+    ('POST', '/artists/search', 1, 0.25),
+    ('GET', '/venues/{generic_venue}/schedule.ics', 3, 0.25),
+    ('GET', '/artists/{generic_artist}/schedule.json', 3, 0.25),
+    ('GET', '/venues/autocomplete?q=ro', 0, 0.1),
+    ('GET', '/artists/autocomplete?q=per', 0, 0.1),
+    ('GET', '/readyz', 1, 0.25),
+]
+
+
+def request(app, client, method, path):
+    from models import page_cache, search_cache
+    with app.app_context():
+        page_cache.invalidate()
+    search_cache.clear()
+    if method == 'POST':
+        return client.post(path, data={'search_term': 'o'})
+    return client.get(path)
+
+
+@pytest.mark.parametrize('method, path, statements, seconds', BUDGETS,
+                         ids=['%s %s' % (budget[0], budget[1]) for budget in BUDGETS])
+def test_route_budget(app, client, seed, count_queries, method, path, statements, seconds):
+    path = path.format(**vars(seed))
+
+    # one warm-up request loads what every worker keeps in memory anyway
+    # (thumbnail and autocomplete indexes)
+    assert request(app, client, method, path).status_code == 200
+
+    with count_queries() as sent:
+        response = request(app, client, method, path)
+        response.get_data()
+    assert response.status_code == 200
+    assert len(sent) <= statements, '%d statements:\n%s' % (len(sent), '\n'.join(sent[:20]))
+
+    elapsed = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        request(app, client, method, path).get_data()
+        elapsed.append(time.perf_counter() - start)
+    assert min(elapsed) <= seconds, '%.3fs' % min(elapsed)
@@ -0,0 +1,510 @@
+import base64
+import json
+import re
+import pytest
+from conftest import SHOWS, VENUES
+
+
+def expected_split(seed, index, entity_id):
+    # (past, upcoming) show counts straight from the seeded rows
+    starts = [show[2] for show in seed.shows if show[index] == entity_id]
+    upcoming = sum(1 for start in starts if start > seed.now)
+    return len(starts) - upcoming, upcoming
+
+
+ADMIN = {'Authorization': 'Basic ' + base64.b64encode(b'admin:admin-secret').decode('ascii')}
+
+
+def csrf_token(response):
+    return re.search(r'name="csrf_token"[^>]*value="([^"]+)"', response.get_data(as_text=True)).group(1)
+
+
+@pytest.fixture
+def booked(seed, app_context):
+    """A new venue and artist with two shows between them, one archived."""
+    from datetime import timedelta
+    from models import db, Artist, Show, ShowArchive, ShowTime, Venue
+    from partitions import archive_partitions, ensure_partition
+
+    # an archived year of its own, long before any seeded show
+    archived_year = seed.now.year - 10
+    ensure_partition(archived_year)
+    archive_partitions(before=archived_year + 1)
+
+    venue = Venue(name='Doomed Venue', city='Austin', state='TX', address='1 Main St',
+                  phone='512-555-0100', genres=['Jazz'], seeking_talent=False,
+                  facebook_link='https://facebook.com/doomed', image_link='https://images.invalid/doomed.png',
+                  website='https://doomed.invalid', seeking_description='')
+    artist = Artist(name='Doomed Artist', city='Austin', state='TX', phone='512-555-0101',
+                    genres=['Jazz'], seeking_venue=False)
+    upcoming = ShowTime(start_time=seed.now + timedelta(days=3))
+    db.session.add_all([venue, artist, upcoming])
+    db.session.flush()
+    db.session.add(Show(venue_id=venue.id, artist_id=artist.id, show_id=upcoming.id,
+                        start_time=upcoming.start_time))
+
+    archived = ShowTime(start_time=seed.now.replace(year=archived_year, month=3, day=1))
+    db.session.add(archived)
+    db.session.flush()
+    db.session.add(ShowArchive(venue_id=venue.id, artist_id=artist.id, show_id=archived.id,
+                               start_time=archived.start_time))
+    shows = [upcoming.id, archived.id]
+    db.session.commit()
+    venue_id, artist_id = venue.id, artist.id
+    yield venue_id, artist_id, shows
+
+    # whatever the test left of them; the shows follow by cascade
+    db.session.rollback()
+    Venue.query.filter_by(id=venue_id).delete()
+    Artist.query.filter_by(id=artist_id).delete()
+    ShowTime.query.filter(ShowTime.id.in_(shows)).delete(synchronize_session=False)
+    db.session.commit()
+
+
+#----------------------------------------------------------------------------#
+# Past and upcoming shows.
+#----------------------------------------------------------------------------#
+
+def test_venue_past_and_upcoming(seed, app_context):
+    from views.venues import venue_data
+
+    data = venue_data(seed.hop)
+    assert (data['past_shows_count'], data['upcoming_shows_count']) == (2, 2)
+    assert sorted(show['artist_name'] for show in data['past_shows']) == ['Guns N Petals', 'Matt Quevedo']
+    assert [show['artist_name'] for show in data['upcoming_shows']] == ['The Wild Sax Band'] * 2
+
+    data = venue_data(seed.pianos)
+    assert (data['past_shows_count'], data['upcoming_shows_count']) == (0, 0)
+
+
+def test_artist_past_and_upcoming(seed, app_context):
+    from views.artists import artist_data
+
+    data = artist_data(seed.petals)
+    assert (data['past_shows_count'], data['upcoming_shows_count']) == (1, 1)
+    assert data['past_shows'][0]['venue_name'] == 'The Musical Hop'
+    assert data['upcoming_shows'][0]['venue_name'] == 'Park Square Live Music & Coffee'
+
+
+def test_every_venue_split_matches_seed(seed, app_context):
+    from views.venues import venue_data
+
+    for venue_id in range(1, VENUES + 1):
+        data = venue_data(venue_id)
+        assert (data['past_shows_count'], data['upcoming_shows_count']) == \
+            expected_split(seed, 0, venue_id), data['name']
+
+
+def test_venues_listing_counts_upcoming(seed, app_context):
+    from views.venues import venues_data
+
+    venues = {venue['id']: venue for area in venues_data() for venue in area['venues']}
+    assert len(venues) == VENUES
+    for venue_id, venue in venues.items():
+        assert venue['num_upcoming_shows'] == expected_split(seed, 0, venue_id)[1]
+
+
+def test_detail_pages(seed, client):
+    response = client.get('/venues/%d' % seed.hop)
+    assert response.status_code == 200
+    assert b'The Wild Sax Band' in response.data
+
+    assert client.get('/artists/%d' % seed.sax).status_code == 200
+    assert client.get('/venues/999999').status_code == 404
+    assert client.get('/artists/999999').status_code == 404
+
+
+def test_shows_listing(seed, client):
+    response = client.get('/shows')
+    assert response.status_code == 200
+    assert response.data.count(b'/artists/') >= SHOWS
+
+
+def test_shows_listing_includes_archived_years(client, booked):
+    venue_id, artist_id, shows = booked
+
+    response = client.get('/shows')
+    assert response.data.count(b'"/artists/%d"' % artist_id) == len(shows) == 2
+
+
+#----------------------------------------------------------------------------#
+# Search.
+#----------------------------------------------------------------------------#
+
+@pytest.mark.parametrize('term, names', [
+    ('Hop', ['The Musical Hop']),
+    ('hop', ['The Musical Hop']),
+    ('Music', ['Park Square Live Music & Coffee', 'The Musical Hop']),
+    ('nothing like this', []),
+])
+def test_venue_search(app_context, term, names):
+    from views.venues import venue_search_data
+
+    results = venue_search_data(term)
+    assert results['count'] == len(names)
+    assert sorted(venue['name'] for venue in results['data']) == names
+
+
+def test_venue_search_counts_upcoming(seed, app_context):
+    from views.venues import venue_search_data
+
+    results = venue_search_data('Music')
+    counts = {venue['id']: venue['num_upcoming_shows'] for venue in results['data']}
+    assert counts == {seed.hop: 2, seed.park: 1}
+
+
+@pytest.mark.parametrize('term, count', [
+    ('band', 1),
+    ('A', 3),
+    ('Performer 01', 10),
+])
+def test_artist_search(app_context, term, count):
+    from views.artists import artist_search_data
+
+    assert artist_search_data(term)['count'] == count
+
+
+def test_search_pages(client):
+    response = client.post('/venues/search', data={'search_term': 'hop'})
+    assert response.status_code == 200
+    assert b'Number of search results for "hop": 1' in response.data
+
+    response = client.post('/artists/search', data={'search_term': 'band'})
+    assert response.status_code == 200
+    assert b'The Wild Sax Band' in response.data
+
+
+def test_search_limit_keyed_on_client(client):
+    from models import search_limiter
+
+    client.post('/venues/search', data={'search_term': 'behind the router'},
+                headers={'X-Forwarded-For': '203.0.113.7'},
+                environ_base={'REMOTE_ADDR': '10.1.2.3'})
+    assert '203.0.113.7' in search_limiter._buckets
+    assert '10.1.2.3' not in search_limiter._buckets
+
+
+#----------------------------------------------------------------------------#
+# Edits.
+#----------------------------------------------------------------------------#
+
+def selected(response, name):
+    select = re.search(r'<select[^>]*name="%s".*?</select>' % name, response.get_data(as_text=True), re.S)
+    return re.findall(r'<option selected value="([^"]+)">', select.group(0))
+
+
+def test_edit_forms_keep_genres(seed, client):
+    # an edit that leaves the genres alone posts back what the form showed
+    assert selected(client.get('/venues/%d/edit' % seed.hop), 'genres') == ['Folk', 'Jazz']
+    assert selected(client.get('/artists/%d/edit' % seed.sax), 'genres') == ['Rock n Roll']
+
+
+def venue_form(venue_id, version, **changes):
+    # what the edit page posts for the booked venue
+    data = {'name': 'Doomed Venue', 'city': 'Austin', 'state': 'TX', 'address': '1 Main St',
+            'phone': '512-555-0100', 'genres': ['Jazz'], 'facebook_link': 'https://facebook.com/doomed',
+            'image_link': 'https://images.invalid/doomed.png', 'website_link': 'https://doomed.invalid',
+            'seeking_description': '', 'version': str(version)}
+    data.update(changes)
+    return data
+
+
+def field(response, name):
+    return re.search(r'<input[^>]*name="%s"[^>]*value="([^"]*)"' % name, response.get_data(as_text=True)).group(1)
+
+
+def venue_row(app, venue_id):
+    from models import db, Venue
+    with app.app_context():
+        venue = Venue.query.get(venue_id)
+        row = venue.name, venue.version_id
+        db.session.remove()
+    return row
+
+
+def test_edit_with_stale_version_is_409(app, client, booked):
+    venue_id, artist_id, shows = booked
+
+    # rendered at version 1, saved by someone else since
+    client.post('/venues/%d/edit' % venue_id, data=venue_form(venue_id, 1, city='Dallas'))
+    response = client.post('/venues/%d/edit' % venue_id,
+                           data=venue_form(venue_id, 1, name='Lost Update', city='Houston'))
+    assert response.status_code == 409
+    assert b'changed by someone else' in response.data
+    assert venue_row(app, venue_id) == ('Doomed Venue', 2)
+
+    # the form offers the current row at its current version, and lists
+    # the edits that were not saved
+    assert (field(response, 'city'), field(response, 'name'), field(response, 'version')) == \
+        ('Dallas', 'Doomed Venue', '2')
+    assert 'Not saved: city was &#34;Houston&#34;' in response.get_data(as_text=True)
+
+
+def test_edit_racing_another_write_is_409(app, client, booked, monkeypatch):
+    from sqlalchemy import create_engine
+    import views.venues
+    venue_id, artist_id, shows = booked
+    apply_changes = views.venues.apply_changes
+
+    # the version matches when checked, but another write lands before the commit
+    def racing(obj, version, values):
+        changed = apply_changes(obj, version, values)
+        other = create_engine(app.config['SQLALCHEMY_DATABASE_URI'])
+        with other.begin() as conn:
+            conn.exec_driver_sql('UPDATE "Venue" SET version_id = version_id + 1 WHERE id = %d' % venue_id)
+        other.dispose()
+        return changed
+    monkeypatch.setattr(views.venues, 'apply_changes', racing)
+
+    response = client.post('/venues/%d/edit' % venue_id, data=venue_form(venue_id, 1, name='Lost Update'))
+    assert response.status_code == 409
+    assert venue_row(app, venue_id) == ('Doomed Venue', 2)
+
+
+def test_unchanged_edit_skips_write(app, client, booked, count_queries):
+    venue_id, artist_id, shows = booked
+
+    with count_queries() as sent:
+        response = client.post('/venues/%d/edit' % venue_id, data=venue_form(venue_id, 1))
+    assert response.status_code == 302
+    # the venue is loaded, and nothing is written or run after a write
+    assert len(sent) == 1 and sent[0].startswith('SELECT'), sent
+    assert venue_row(app, venue_id) == ('Doomed Venue', 1)
+
+
+#----------------------------------------------------------------------------#
+# Deletes.
+#----------------------------------------------------------------------------#
+
+def test_delete_requires_csrf_token(app, client, booked, monkeypatch):
+    from models import db, ShowTime, Venue
+    monkeypatch.setitem(app.config, 'WTF_CSRF_ENABLED', True)
+    venue_id, artist_id, shows = booked
+
+    # a forged post without a token is refused
+    client.post('/venues/%d/delete' % venue_id)
+    client.post('/admin/bulk-delete', data={'venue': venue_id, 'artist': artist_id}, headers=ADMIN)
+    assert Venue.query.get(venue_id) is not None
+
+    page = client.get('/venues/%d/delete' % venue_id)
+    response = client.post('/venues/%d/delete' % venue_id, data={'csrf_token': csrf_token(page)})
+    assert response.status_code == 302
+    db.session.expire_all()
+    assert Venue.query.get(venue_id) is None
+    # ShowTime rows of the cascaded shows go in the same transaction
+    assert ShowTime.query.filter(ShowTime.id.in_(shows)).count() == 0
+
+
+def test_bulk_delete_form_carries_csrf_token(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, 'WTF_CSRF_ENABLED', True)
+    assert csrf_token(client.get('/admin/bulk-delete', headers=ADMIN))
+
+
+def test_admin_pages_require_password(app, client, booked, monkeypatch):
+    from models import Venue
+    venue_id, artist_id, shows = booked
+
+    assert client.post('/admin/bulk-delete', data={'venue': venue_id}).status_code == 401
+    wrong = {'Authorization': 'Basic ' + base64.b64encode(b'admin:guess').decode('ascii')}
+    assert client.get('/admin/tasks', headers=wrong).status_code == 401
+    assert Venue.query.get(venue_id) is not None
+    assert client.get('/admin/tasks', headers=ADMIN).status_code == 200
+
+    # without a configured password the pages are not there at all
+    monkeypatch.setitem(app.config, 'ADMIN_PASSWORD', None)
+    assert client.get('/admin/tasks', headers=ADMIN).status_code == 404
+
+
+def remaining(app, venue_id):
+    # (shows, archived shows, DeletedRecord rows) that mention the venue
+    from models import db, DeletedRecord, Show, ShowArchive
+    with app.app_context():
+        records = [(record.table_name, record.record) for record in DeletedRecord.query]
+        counts = (Show.query.filter_by(venue_id=venue_id).count(),
+                  ShowArchive.query.filter_by(venue_id=venue_id).count(),
+                  sorted(table for table, record in records
+                         if venue_id in (record.get('id') if table == 'Venue' else None,
+                                         record.get('venue_id'))))
+        db.session.remove()
+    return counts
+
+
+def test_delete_policy_cascade(app, client, booked, monkeypatch):
+    monkeypatch.setitem(app.config, 'DELETE_POLICY', 'cascade')
+    venue_id, artist_id, shows = booked
+
+    client.post('/venues/%d/delete' % venue_id)
+    assert remaining(app, venue_id) == (0, 0, [])
+
+
+def test_delete_policy_archive(app, client, booked, monkeypatch):
+    monkeypatch.setitem(app.config, 'DELETE_POLICY', 'archive')
+    venue_id, artist_id, shows = booked
+
+    client.post('/venues/%d/delete' % venue_id)
+    # the venue and both cascaded shows, live and archived, are copied
+    assert remaining(app, venue_id) == (0, 0, ['Show', 'ShowArchive', 'Venue'])
+
+#----------------------------------------------------------------------------#
+# Home page rankings.
+#----------------------------------------------------------------------------#
+
+def test_rankings_follow_writes(client, booked):
+    venue_id, artist_id, shows = booked
+
+    # never refreshed yet, or refreshed before this venue was inserted
+    client.get('/')
+    response = client.post('/venues/create', data={
+        'name': 'Brand New Room', 'city': 'Austin', 'state': 'TX', 'address': '2 Main St',
+        'phone': '512-555-0102', 'genres': 'Jazz', 'facebook_link': 'https://facebook.com/newroom',
+        'image_link': 'https://images.invalid/newroom.png'})
+    assert b'successfully listed' in response.data
+    assert b'Brand New Room' in client.get('/').data
+    assert b'Doomed Venue' in client.get('/').data
+
+    # the redirect shows the flash that names the venue
+    client.post('/venues/%d/delete' % venue_id, follow_redirects=True)
+    assert b'Doomed Venue' not in client.get('/').data
+
+
+#----------------------------------------------------------------------------#
+# Page cache.
+#----------------------------------------------------------------------------#
+
+def test_page_built_across_a_write_is_not_cached(app, client):
+    from models import page_cache
+    from views import render_cached
+    builds = []
+
+    def build():
+        builds.append(len(builds))
+        if len(builds) == 1:
+            # a write commits and invalidates while this page is built
+            page_cache.invalidate()
+        return []
+
+    with app.test_request_context('/shows'):
+        render_cached('racing', 'pages/shows.html', 'shows', build)
+        render_cached('racing', 'pages/shows.html', 'shows', build)
+    assert builds == [0, 1]
+
+
+#----------------------------------------------------------------------------#
+# Write errors.
+#----------------------------------------------------------------------------#
+
+def test_refused_write_is_flashed(seed, client):
+    response = client.post('/shows/create', data={
+        'artist_id': 999999, 'venue_id': seed.hop, 'start_time': str(seed.now)})
+    assert response.status_code == 200
+    assert b'Show could not be listed' in response.data
+
+
+def test_outage_during_write_is_503(seed, client, monkeypatch):
+    from sqlalchemy.exc import OperationalError
+    from models import db
+
+    def commit():
+        raise OperationalError('COMMIT', {}, Exception('server closed the connection'))
+    monkeypatch.setattr(db.session, 'commit', commit)
+
+    response = client.post('/artists/%d/delete' % seed.sax)
+    assert response.status_code == 503
+
+
+#----------------------------------------------------------------------------#
+# Feeds.
+#----------------------------------------------------------------------------#
+
+def test_schedule_feed(seed, client):
+    response = client.get('/venues/%d/schedule.json' % seed.hop)
+    assert response.status_code == 200
+    shows = json.loads(response.get_data(as_text=True))['shows']
+    assert [show['artist_name'] for show in shows] == ['The Wild Sax Band'] * 2
+
+    response = client.get('/venues/%d/schedule.json' % seed.hop,
+                          headers={'If-None-Match': response.headers['ETag']})
+    assert response.status_code == 304
+
+
+def test_schedule_feed_after_removed_show(client, booked):
+    from datetime import datetime, timezone
+    from models import db, Show
+    venue_id, artist_id, shows = booked
+
+    first = client.get('/venues/%d/schedule.ics' % venue_id)
+    stamp = re.search(r'DTSTAMP:(\d{8}T\d{6})Z', first.get_data(as_text=True)).group(1)
+    stamp = datetime.strptime(stamp, '%Y%m%dT%H%M%S').replace(tzinfo=timezone.utc)
+    assert abs((datetime.now(timezone.utc) - stamp).total_seconds()) < 300
+
+    Show.query.filter_by(show_id=shows[0]).delete()
+    db.session.commit()
+
+    # neither validator a client kept may answer for the shorter schedule
+    assert 'Last-Modified' not in first.headers
+    response = client.get('/venues/%d/schedule.ics' % venue_id,
+                          headers={'If-None-Match': first.headers['ETag']})
+    assert response.status_code == 200
+    response = client.get('/venues/%d/schedule.ics' % venue_id,
+                          headers={'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'})
+    assert response.status_code == 200
+    assert b'VEVENT' not in response.data
+
+
+def test_schedule_feed_after_other_side_edited(app, client, booked):
+    from models import db, Artist
+    venue_id, artist_id, shows = booked
+
+    first = client.get('/venues/%d/schedule.ics' % venue_id)
+    artist = Artist.query.get(artist_id)
+    artist.name = 'Renamed Artist'
+    db.session.commit()
+
+    response = client.get('/venues/%d/schedule.ics' % venue_id,
+                          headers={'If-None-Match': first.headers['ETag']})
+    assert response.status_code == 200
+    assert b'Renamed Artist at Doomed Venue' in response.data
+
+
+#----------------------------------------------------------------------------#
+# Archived years.
+#----------------------------------------------------------------------------#
+
+def test_archived_shows_stay_past(seed, app_context):
+    # runs after every other split test: moving old partitions to
+    # ShowArchive must not change any split
+    from partitions import archive_partitions
+    from views.artists import artist_data
+    from views.venues import venue_data
+
+    assert archive_partitions(before=seed.now.year - 1)
+    for venue_id in range(1, VENUES + 1):
+        data = venue_data(venue_id)
+        assert (data['past_shows_count'], data['upcoming_shows_count']) == \
+            expected_split(seed, 0, venue_id), data['name']
+    data = artist_data(seed.petals)
+    assert (data['past_shows_count'], data['upcoming_shows_count']) == (1, 1)
+
+
+def test_show_in_archived_year(app, seed, client, app_context):
+    # this process creates the year's partition, then another one (here a
+    # separate connection) archives the year again
+    from sqlalchemy import create_engine
+    from models import db, Show
+    from partitions import ensure_partition
+    start = seed.now.replace(year=seed.now.year - 2, month=6, day=1)
+
+    ensure_partition(start.year)
+    other = create_engine(app.config['SQLALCHEMY_DATABASE_URI'])
+    with other.begin() as conn:
+        conn.exec_driver_sql('ALTER TABLE "Show" DETACH PARTITION "Show_y%d"' % start.year)
+        conn.exec_driver_sql('DROP TABLE "Show_y%d"' % start.year)
+    other.dispose()
+
+    response = client.post('/shows/create', data={
+        'artist_id': seed.quevedo, 'venue_id': seed.pianos, 'start_time': str(start)})
+    assert b'Show was successfully listed!' in response.data
+
+    show = Show.query.filter_by(venue_id=seed.pianos, start_time=start).one()
+    db.session.delete(show)
+    db.session.commit()
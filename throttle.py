@@ -0,0 +1,87 @@
+import threading
+import time
+
+#----------------------------------------------------------------------------#
+# Request coalescing and rate limiting.
+#----------------------------------------------------------------------------#
+
+
+class _Call(object):
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """Runs one call per key at a time; concurrent callers share its result."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class TokenBucketLimiter(object):
+    """In-memory token bucket per client key.
+
+    Every client may burst up to ``SEARCH_RATE_BURST`` requests and is then
+    refilled at ``SEARCH_RATE_LIMIT`` requests per second. Limits are per
+    worker process.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SEARCH_RATE_LIMIT', 2.0)
+        app.config.setdefault('SEARCH_RATE_BURST', 10)
+        self.rate = float(app.config['SEARCH_RATE_LIMIT'])
+        self.burst = float(app.config['SEARCH_RATE_BURST'])
+
+    def allow(self, key):
+        now = time.time()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+
+            # forget clients whose bucket has long been full again
+            if len(self._buckets) > 10000:
+                idle = self.burst / self.rate
+                self._buckets = dict((k, v) for k, v in self._buckets.items()
+                                     if now - v[1] < idle)
+        return allowed
+
+    def retry_after(self):
+        return max(1, int(round(1 / self.rate)))
@@ -0,0 +1,206 @@
+import ipaddress
+import re
+
+#----------------------------------------------------------------------------#
+# Validation.
+#----------------------------------------------------------------------------#
+
+# Every rule below is built once at import. forms.py renders its choices
+# from the same tuples, and the create/edit handlers validate request.form
+# (or any dict, e.g. a decoded JSON body) with the schemas at the bottom
+# instead of instantiating a WTForms form per request.
+
+STATES = (
+    'AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'DC', 'FL', 'GA', 'HI',
+    'ID', 'IL', 'IN', 'IA', 'KS', 'KY', 'LA', 'ME', 'MT', 'NE', 'NV', 'NH',
+    'NJ', 'NM', 'NY', 'NC', 'ND', 'OH', 'OK', 'OR', 'MD', 'MA', 'MI', 'MN',
+    'MS', 'MO', 'PA', 'RI', 'SC', 'SD', 'TN', 'TX', 'UT', 'VT', 'VA', 'WA',
+    'WV', 'WI', 'WY',
+)
+
+GENRES = (
+    'Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk',
+    'Funk', 'Hip-Hop', 'Heavy Metal', 'Instrumental', 'Jazz',
+    'Musical Theatre', 'Pop', 'Punk', 'R&B', 'Reggae', 'Rock n Roll', 'Soul',
+    'Other',
+)
+
+STATE_CHOICES = tuple((state, state) for state in STATES)
+GENRE_CHOICES = tuple((genre, genre) for genre in GENRES)
+
+PHONE_RE = re.compile(r'^[a-zA-Z0-9]{3}-[a-zA-Z0-9]{3}-[a-zA-Z0-9]{4}$')
+# WTForms' URL(): a scheme, a host, then anything. The host is an IPv4
+# address or dot-separated labels of letters, digits, '_' and inner '-',
+# ending in a TLD (see url() below)
+URL_RE = re.compile(
+    r'^[a-z]+://(?P<host>[^/?:]+)(?::[0-9]+)?(?:/.*?)?(?:\?.*)?$', re.IGNORECASE)
+HOST_LABEL_RE = re.compile(r'^(xn-|[a-z0-9_]+)(-[a-z0-9_]+)*$', re.IGNORECASE)
+TLD_RE = re.compile(r'^([a-z]{2,20}|xn--([a-z0-9]+-)*[a-z0-9]+)$', re.IGNORECASE)
+
+
+class ValidationError(Exception):
+
+    def __init__(self, errors):
+        super(ValidationError, self).__init__(errors)
+        self.errors = errors
+
+
+#  Rules
+#  ----------------------------------------------------------------
+# Each rule takes the raw value and returns (True, clean value) or
+# (False, error message).
+
+def text(value):
+    return True, (value or '').strip()
+
+
+def required(value):
+    value = (value or '').strip()
+    if not value:
+        return False, 'This field is required.'
+    return True, value
+
+
+def choice(allowed):
+    allowed = frozenset(allowed)
+
+    def rule(value):
+        if value not in allowed:
+            return False, 'Not a valid choice.'
+        return True, value
+    return rule
+
+
+def choices(allowed):
+    allowed = frozenset(allowed)
+
+    def rule(values):
+        if not values:
+            return False, 'This field is required.'
+        if not allowed.issuperset(values):
+            return False, 'Not a valid choice.'
+        return True, list(values)
+    return rule
+
+
+def phone(value):
+    value = (value or '').strip()
+    if not PHONE_RE.match(value):
+        return False, 'Please enter a valid phone number'
+    return True, value
+
+
+def _hostname(host):
+    try:
+        ipaddress.IPv4Address(host)
+        return True
+    except ValueError:
+        pass
+    try:
+        host = host.encode('idna').decode('ascii')
+    except UnicodeError:
+        pass
+    labels = host.split('.')
+    if len(host) > 253 or len(labels) < 2 or not TLD_RE.match(labels[-1]):
+        return False
+    return all(len(label) <= 63 and HOST_LABEL_RE.match(label) for label in labels)
+
+
+def url(value):
+    value = (value or '').strip()
+    match = URL_RE.match(value)
+    if not match or not _hostname(match.group('host')):
+        return False, 'Invalid URL.'
+    return True, value
+
+
+def flag(value):
+    return True, value in ('y', True)
+
+
+def integer(value):
+    try:
+        return True, int(value)
+    except (TypeError, ValueError):
+        return False, 'Not a valid integer value.'
+
+
+def timestamp(value):
+    import dateutil.parser
+    try:
+        return True, dateutil.parser.parse(value)
+    except (TypeError, ValueError, OverflowError):
+        return False, 'Not a valid datetime value.'
+
+
+#  Schemas
+#  ----------------------------------------------------------------
+
+class Schema(object):
+    """Maps form keys to model attributes through precompiled rules."""
+
+    def __init__(self, *fields, **options):
+        # (form key, attribute, rule); multi-valued keys are read with getlist
+        self.fields = tuple(fields)
+        self.multiple = frozenset(options.get('multiple', ()))
+
+    def _get(self, data, key):
+        if key in self.multiple:
+            if hasattr(data, 'getlist'):
+                return data.getlist(key)
+            value = data.get(key) or []
+            return [value] if isinstance(value, str) else value
+        return data.get(key)
+
+    def validate(self, data):
+        values, errors = {}, {}
+        for key, attribute, rule in self.fields:
+            ok, result = rule(self._get(data, key))
+            if ok:
+                values[attribute] = result
+            else:
+                errors[key] = result
+        if errors:
+            raise ValidationError(errors)
+        return values
+
+
+VENUE = Schema(
+    ('name', 'name', required),
+    ('city', 'city', required),
+    ('state', 'state', choice(STATES)),
+    ('address', 'address', required),
+    ('phone', 'phone', phone),
+    ('genres', 'genres', choices(GENRES)),
+    ('facebook_link', 'facebook_link', url),
+    ('image_link', 'image_link', url),
+    ('website_link', 'website', text),
+    ('seeking_talent', 'seeking_talent', flag),
+    ('seeking_description', 'seeking_description', text),
+    multiple=('genres',)
+)
+
+ARTIST = Schema(
+    ('name', 'name', required),
+    ('city', 'city', required),
+    ('state', 'state', choice(STATES)),
+    ('phone', 'phone', phone),
+    ('genres', 'genres', choices(GENRES)),
+    ('facebook_link', 'facebook_link', url),
+    ('image_link', 'image_link', url),
+    ('website_link', 'website', text),
+    ('seeking_venue', 'seeking_venue', flag),
+    ('seeking_description', 'seeking_description', text),
+    multiple=('genres',)
+)
+
+SHOW = Schema(
+    ('artist_id', 'artist_id', integer),
+    ('venue_id', 'venue_id', integer),
+    ('start_time', 'start_time', timestamp)
+)
+
+
+def entity_ids(values):
+    # ids from bulk requests; anything that is not an integer is dropped
+    return [int(value) for value in values if str(value).isdigit()]
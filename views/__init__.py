@@ -0,0 +1,167 @@
+import hmac
+from functools import wraps
+from flask import Response, current_app, flash, g, render_template, abort, request, session
+from sqlalchemy.exc import DataError, IntegrityError
+from models import (db, page_cache, search_cache, search_flight, search_limiter, task_queue,
+                    Artist, Show, ShowArchive, ShowTime, Venue)
+from resilience import retry_read
+from validation import ValidationError
+
+#----------------------------------------------------------------------------#
+# Caching.
+#----------------------------------------------------------------------------#
+
+def render_cached(key, template, name, build):
+    # pages with pending flash messages are rendered fresh so the message
+    # is neither lost nor baked into the cached copy
+    flashes = '_flashes' in session
+    # read before the database is: if a write invalidates the cache while
+    # the page is built, the page goes under the old generation, unread
+    generation = page_cache.generation()
+    if not flashes:
+        page = page_cache.get('page:' + key, generation)
+        if page is not None and 'profile' not in g:
+            return page
+
+    # profiled requests measure the full uncached path
+    data = retry_read(build) if 'profile' in g else \
+        page_cache.get_or_set('data:' + key, lambda: retry_read(build), generation=generation)
+    if data is None:
+        abort(404)
+
+    page = render_template(template, **{name: data})
+    if not flashes:
+        page_cache.set('page:' + key, page, generation=generation)
+    return page
+
+
+def cached_search(kind, term, build):
+    # identical searches within SEARCH_CACHE_TTL are answered from memory,
+    # concurrent misses share one query, and only misses spend rate tokens
+    key = 'search:%s:%s' % (kind, term.lower())
+    results = search_cache.get(key)
+    if results is not None:
+        return results
+
+    if not search_limiter.allow(request.remote_addr):
+        abort(429)
+
+    return search_flight.do(key, lambda: search_cache.get_or_set(key, lambda: retry_read(build)))
+
+
+#----------------------------------------------------------------------------#
+# Admin.
+#----------------------------------------------------------------------------#
+
+def admin_required(view):
+    # /admin pages take HTTP basic auth with ADMIN_PASSWORD (any user name),
+    # and do not exist at all while it is unset
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        password = current_app.config.get('ADMIN_PASSWORD')
+        if not password:
+            abort(404)
+        auth = request.authorization
+        if auth is None or not hmac.compare_digest((auth.password or '').encode('utf-8'),
+                                                   password.encode('utf-8')):
+            return Response('Admin password required.', 401,
+                            {'WWW-Authenticate': 'Basic realm="Fyyur admin"'})
+        return view(*args, **kwargs)
+    return wrapper
+
+
+#----------------------------------------------------------------------------#
+# Writes.
+#----------------------------------------------------------------------------#
+
+class EditConflict(Exception):
+    pass
+
+
+# input the database refused (a missing artist or venue, an oversized
+# value); write handlers flash these, while anything else, an outage
+# included, reaches the app's error handlers
+WRITE_ERRORS = (IntegrityError, DataError)
+
+
+def apply_changes(obj, version, values):
+    # optimistic locking: the form carries the version it was rendered
+    # from, and only columns whose value actually changed are written back
+    if version != str(obj.version_id):
+        raise EditConflict()
+
+    changed = [key for key, value in values.items() if getattr(obj, key) != value]
+    for key in changed:
+        setattr(obj, key, values[key])
+    return changed
+
+
+def csrf_token():
+    # flask_wtf (and WTForms) load on the first form, not at import
+    from flask_wtf.csrf import generate_csrf
+    return generate_csrf()
+
+
+def check_csrf():
+    # the CSRF check FlaskForm.validate_on_submit() made, for every form
+    # post that writes; raises validation.ValidationError
+    if current_app.config.get('WTF_CSRF_ENABLED', True):
+        from flask_wtf.csrf import validate_csrf
+        from wtforms.validators import ValidationError as CSRFError
+        try:
+            validate_csrf(request.form.get('csrf_token'))
+        except CSRFError as e:
+            raise ValidationError({'csrf_token': str(e)})
+
+
+def validate_form(schema):
+    # CSRF, then the shared precompiled schema
+    check_csrf()
+    return schema.validate(request.form)
+
+
+def flash_errors(error):
+    for message in error.errors.values():
+        flash("Error: " + message)
+
+
+def flash_rejected(obj, values):
+    # after an edit conflict the form shows the current row; the posted
+    # values that differ from it are listed so they can be made again
+    for key, value in values.items():
+        if getattr(obj, key) != value:
+            if isinstance(value, list):
+                value = ', '.join(value)
+            flash('Not saved: %s was "%s" in your edit' % (key.replace('_', ' '), value))
+
+
+SHOW_COLUMNS = {Venue: 'venue_id', Artist: 'artist_id'}
+
+
+def delete_entities(model, ids):
+    # one DELETE for all ids; their shows go with them through ON DELETE
+    # CASCADE, and under the 'archive' policy database triggers copy every
+    # removed row into DeletedRecord
+    db.session.execute(db.text("SELECT set_config('fyyur.delete_policy', :policy, true)"),
+                       {'policy': current_app.config.get('DELETE_POLICY', 'cascade')})
+
+    # ShowTime rows are referenced by shows, not the other way round, so
+    # they are collected first and removed in the same transaction
+    column = SHOW_COLUMNS[model]
+    show_ids = [show_id for show_id, in db.session.execute(db.union_all(
+        db.select([Show.show_id]).where(getattr(Show, column).in_(ids)),
+        db.select([ShowArchive.show_id]).where(getattr(ShowArchive, column).in_(ids))))]
+
+    result = db.session.execute(model.__table__.delete().where(model.id.in_(ids)))
+    if show_ids:
+        db.session.execute(ShowTime.__table__.delete().where(ShowTime.id.in_(show_ids)))
+    db.session.commit()
+    return result.rowcount
+
+
+def after_write(kind, *entity_ids):
+    # cached pages are dropped right away, everything else runs in the background
+    page_cache.invalidate()
+    search_cache.clear()
+    for entity_id in entity_ids:
+        task_queue.enqueue_post_write(kind, entity_id)
@@ -0,0 +1,257 @@
+from datetime import datetime
+from flask import Blueprint, current_app, render_template, request, flash, redirect, url_for, abort, jsonify
+from sqlalchemy.orm.exc import StaleDataError
+from autocomplete import autocomplete
+import feeds
+from models import db, Venue, Show, Artist
+from partitions import all_shows
+from views import (WRITE_ERRORS, EditConflict, after_write, apply_changes, cached_search,
+                   check_csrf, delete_entities, flash_errors, flash_rejected, render_cached,
+                   validate_form)
+import validation
+
+bp = Blueprint('artists', __name__)
+
+#----------------------------------------------------------------------------#
+# Artists.
+#----------------------------------------------------------------------------#
+
+def artists_data():
+    data = []
+    for artist in Artist.query.all():
+        data.append({
+            "id": artist.id,
+            "name": artist.name
+        })
+
+    return data
+
+
+@bp.route('/artists')
+def artists():
+    return render_cached('artists', 'pages/artists.html', 'artists', artists_data)
+
+
+def artist_search_data(term):
+    # upcoming show counts for every match in one grouped query
+    upcoming = db.session.query(Show.artist_id, db.func.count().label('num_upcoming_shows')).filter(
+        Show.start_time > datetime.now()).group_by(Show.artist_id).subquery()
+    artists = db.session.query(Artist.id, Artist.name, db.func.coalesce(upcoming.c.num_upcoming_shows, 0)).outerjoin(
+        upcoming, upcoming.c.artist_id == Artist.id).filter(Artist.name.ilike('%' + term + '%')).all()
+
+    return {
+        "count": len(artists),
+        "data": [{
+            "id": artist_id,
+            "name": name,
+            "num_upcoming_shows": num_upcoming
+        } for artist_id, name, num_upcoming in artists]
+    }
+
+
+@bp.route('/artists/search', methods=['POST'])
+def search_artists():
+    # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
+    # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
+    # search for "band" should return "The Wild Sax Band".
+    term = request.form.get('search_term', '')
+    response = cached_search('artist', term, lambda: artist_search_data(term))
+    return render_template('pages/search_artists.html', results=response, search_term=term)
+
+
+def artist_data(artist_id):
+    artist = Artist.query.get(artist_id)
+
+    # show non existent
+    if artist is None:
+        return None
+
+    data = {
+        "id": artist.id,
+        "name": artist.name,
+        "genres": artist.genres,
+        "city": artist.city,
+        "state": artist.state,
+        "phone": artist.phone,
+        "website": artist.website,
+        "facebook_link": artist.facebook_link,
+        "seeking_venue": artist.seeking_venue,
+        "seeking_description": artist.seeking_description,
+        "image_link": artist.image_link,
+        "past_shows": [],
+        "upcoming_shows": [],
+        "past_shows_count": 0,
+        "upcoming_shows_count": 0
+    }
+
+    # build up info about shows
+    # past shows may live in archived partitions, upcoming ones never do
+    now = datetime.now()
+    shows = all_shows()
+    past_shows = db.session.query(Venue.id, Venue.name, Venue.image_link, shows.c.start_time).join(
+        shows, shows.c.venue_id == Venue.id).filter(shows.c.artist_id == artist_id, shows.c.start_time <= now).all()
+    upcoming_shows = db.session.query(Venue.id, Venue.name, Venue.image_link, Show.start_time).select_from(
+        Venue).join(Show).filter(Show.artist_id == artist_id, Show.start_time > now).all()
+
+    for show in past_shows:
+        v_id, v_name, v_link, s_start = show
+        data["past_shows"].append({
+            "venue_id": v_id,
+            "venue_name": v_name,
+            "venue_image_link": v_link,
+            "start_time": s_start.strftime("%Y-%m-%d %H:%M:%S")
+        })
+
+    for show in upcoming_shows:
+        v_id, v_name, v_link, s_start = show
+        data["upcoming_shows"].append({
+            "venue_id": v_id,
+            "venue_name": v_name,
+            "venue_image_link": v_link,
+            "start_time": s_start.strftime("%Y-%m-%d %H:%M:%S")
+        })
+
+    data["past_shows_count"] = len(data["past_shows"])
+    data["upcoming_shows_count"] = len(data["upcoming_shows"])
+
+    return data
+
+
+@bp.route('/artists/autocomplete')
+def autocomplete_artists():
+    return jsonify(autocomplete.search('artist', request.args.get('q', '')))
+
+
+@bp.route('/artists/<int:artist_id>/schedule.<any(ics, json):fmt>')
+def artist_schedule(artist_id, fmt):
+    return feeds.schedule(Artist.query.get_or_404(artist_id), fmt)
+
+
+@bp.route('/artists/<int:artist_id>')
+def show_artist(artist_id):
+    # shows the artist page with the given artist_id
+    return render_cached('artist:%d' % artist_id, 'pages/show_artist.html', 'artist',
+                         lambda: artist_data(artist_id))
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+
+@bp.route('/artists/create', methods=['GET'])
+def create_artist_form():
+    from forms import ArtistForm
+    form = ArtistForm()
+    return render_template('forms/new_artist.html', form=form)
+
+
+@bp.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+    # called upon submitting the new artist listing form
+    try:
+        values = validate_form(validation.ARTIST)
+    except validation.ValidationError as e:
+        flash_errors(e)
+        return render_template('pages/home.html')
+
+    try:
+        artist = Artist(**values)
+        db.session.add(artist)
+        db.session.commit()
+        after_write('artist', artist.id)
+        flash('Artist ' + values['name'] + ' was successfully listed!')
+    except WRITE_ERRORS:
+        current_app.logger.exception('Artist %r could not be listed', values['name'])
+        db.session.rollback()
+        flash('An error occurred. Artist ' + values['name'] + ' could not be listed.')
+    finally:
+        db.session.close()
+    return render_template('pages/home.html')
+
+
+@bp.route('/artists/<int:artist_id>/delete', methods=['GET'])
+def delete_artist_form(artist_id):
+    # not page cached, unlike the detail page, so it can carry a CSRF token
+    artist = Artist.query.get_or_404(artist_id)
+    return render_template('forms/delete.html', kind='artist', name=artist.name,
+                           cancel=url_for('artists.show_artist', artist_id=artist_id))
+
+
+@bp.route('/artists/<int:artist_id>/delete', methods=['POST'])
+def delete_artist(artist_id):
+    artist = Artist.query.get_or_404(artist_id)
+    name = artist.name
+
+    try:
+        check_csrf()
+    except validation.ValidationError as e:
+        flash_errors(e)
+        return redirect(url_for('artists.delete_artist_form', artist_id=artist_id))
+
+    try:
+        delete_entities(Artist, [artist_id])
+        after_write('artist', artist_id)
+        flash('Artist "' + name + '" and their shows have been removed.')
+    except WRITE_ERRORS:
+        current_app.logger.exception('Artist %d could not be removed', artist_id)
+        db.session.rollback()
+        flash('An error occurred. Artist "' + name + '" could not be removed.')
+    finally:
+        db.session.close()
+
+    return redirect(url_for('main.index'))
+
+#  Update
+#  ----------------------------------------------------------------
+
+
+def edit_artist_form(artist):
+    # the edit form as the row stands now, whatever was posted
+    from forms import ArtistForm
+    return ArtistForm(formdata=None, obj=artist, website_link=artist.website, version=artist.version_id)
+
+
+@bp.route('/artists/<int:artist_id>/edit', methods=['GET'])
+def edit_artist(artist_id):
+    artist = Artist.query.get(artist_id)
+
+    if artist is None:
+        abort(404)
+
+    return render_template('forms/edit_artist.html', form=edit_artist_form(artist), artist=artist)
+
+
+@bp.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+    artist = Artist.query.get(artist_id)
+
+    if artist is None:
+        abort(404)
+
+    try:
+        values = validate_form(validation.ARTIST)
+    except validation.ValidationError as e:
+        flash_errors(e)
+        from forms import ArtistForm
+        return render_template('forms/edit_artist.html', form=ArtistForm(), artist=artist), 400
+
+    try:
+        changed = apply_changes(artist, request.form.get('version'), values)
+
+        if changed:
+            db.session.commit()
+            after_write('artist', artist_id)
+    except (EditConflict, StaleDataError):
+        db.session.rollback()
+        artist = Artist.query.get_or_404(artist_id)
+        flash('Artist ' + artist.name + ' was changed by someone else while you were editing. '
+              'Check the current details and submit your changes again.')
+        flash_rejected(artist, values)
+        return render_template('forms/edit_artist.html', form=edit_artist_form(artist), artist=artist), 409
+    except WRITE_ERRORS:
+        current_app.logger.exception('Artist %d could not be updated', artist_id)
+        db.session.rollback()
+        flash('An error occurred. Artist ' + values['name'] + ' could not be updated.')
+    finally:
+        db.session.close()
+
+    return redirect(url_for('artists.show_artist', artist_id=artist_id))
@@ -0,0 +1,93 @@
+from flask import Blueprint, current_app, render_template, request, flash, redirect, url_for, jsonify
+from models import db, task_queue, Artist, Venue
+from views import WRITE_ERRORS, admin_required, after_write, check_csrf, delete_entities, flash_errors
+from resilience import circuit_breaker, pool_status
+import rankings
+import validation
+
+bp = Blueprint('main', __name__)
+
+#----------------------------------------------------------------------------#
+# Pages.
+#----------------------------------------------------------------------------#
+
+
+@bp.route('/')
+def index():
+    return render_template('pages/home.html',
+                           rankings=rankings.top(current_app.config['RANKING_SIZE']))
+
+
+#  Health
+#  ----------------------------------------------------------------
+
+@bp.route('/healthz')
+def healthz():
+    # liveness: never touches the database
+    return jsonify(status='ok', database=circuit_breaker.status())
+
+
+@bp.route('/readyz')
+def readyz():
+    # readiness: one round trip through the pool
+    try:
+        db.session.execute(db.text('SELECT 1'))
+        ready, error = True, None
+    except Exception as e:
+        db.session.rollback()
+        ready, error = False, str(e).splitlines()[0]
+
+    body = {
+        'status': 'ok' if ready else 'unavailable',
+        'database': dict(circuit_breaker.status(), error=error),
+        'pool': pool_status(db.engine)
+    }
+    return jsonify(body), 200 if ready else 503
+
+
+#  Admin
+#  ----------------------------------------------------------------
+
+@bp.route('/admin/tasks')
+@admin_required
+def admin_tasks():
+    return render_template('pages/admin_tasks.html', stats=task_queue.stats())
+
+
+BULK_DELETE_MODELS = {'venue': Venue, 'artist': Artist}
+
+
+@bp.route('/admin/bulk-delete', methods=['GET'])
+@admin_required
+def bulk_delete_form():
+    return render_template('pages/admin_bulk_delete.html',
+                           venues=db.session.query(Venue.id, Venue.name).order_by(Venue.name).all(),
+                           artists=db.session.query(Artist.id, Artist.name).order_by(Artist.name).all())
+
+
+@bp.route('/admin/bulk-delete', methods=['POST'])
+@admin_required
+def bulk_delete():
+    try:
+        check_csrf()
+    except validation.ValidationError as e:
+        flash_errors(e)
+        return redirect(url_for('main.bulk_delete_form'))
+
+    removed = {}
+    try:
+        for kind, model in BULK_DELETE_MODELS.items():
+            ids = validation.entity_ids(request.form.getlist(kind))
+            if ids:
+                removed[kind] = delete_entities(model, ids)
+                after_write(kind, *ids)
+        flash('Removed %d venues and %d artists along with their shows.'
+              % (removed.get('venue', 0), removed.get('artist', 0)))
+    except WRITE_ERRORS:
+        current_app.logger.exception('Bulk delete failed after removing %r', removed)
+        db.session.rollback()
+        flash('An error occurred. Nothing more could be removed.')
+    finally:
+        db.session.close()
+
+    return redirect(url_for('main.bulk_delete_form'))
@@ -0,0 +1,75 @@
+from flask import Blueprint, current_app, render_template, flash
+from models import db, Venue, Show, ShowTime, Artist
+from partitions import all_shows, ensure_partition
+from views import WRITE_ERRORS, after_write, flash_errors, render_cached, validate_form
+import validation
+
+bp = Blueprint('shows', __name__)
+
+#----------------------------------------------------------------------------#
+# Shows.
+#----------------------------------------------------------------------------#
+
+def shows_data():
+    # every show, archived years included
+    shows = all_shows()
+    shows = db.session.query(
+        shows.c.venue_id, Venue.name, shows.c.artist_id, Artist.name, Artist.image_link, shows.c.start_time
+    ).select_from(shows).join(Venue, Venue.id == shows.c.venue_id).join(
+        Artist, Artist.id == shows.c.artist_id).order_by(shows.c.start_time).all()
+
+    return [{
+        "venue_id": venue_id,
+        "venue_name": venue_name,
+        "artist_id": artist_id,
+        "artist_name": artist_name,
+        "artist_image_link": artist_image_link,
+        "start_time": start_time.strftime("%Y-%m-%d %H:%M:%S")
+    } for venue_id, venue_name, artist_id, artist_name, artist_image_link, start_time in shows]
+
+
+@bp.route('/shows')
+def shows():
+    # displays list of shows at /shows
+    return render_cached('shows', 'pages/shows.html', 'shows', shows_data)
+
+
+@bp.route('/shows/create')
+def create_shows():
+    # renders form. do not touch.
+    from forms import ShowForm
+    form = ShowForm()
+    return render_template('forms/new_show.html', form=form)
+
+
+@bp.route('/shows/create', methods=['POST'])
+def create_show_submission():
+    # called to create new shows in the db, upon submitting new show listing form
+    try:
+        values = validate_form(validation.SHOW)
+    except validation.ValidationError as e:
+        flash_errors(e)
+        return render_template('pages/home.html')
+
+    try:
+        ensure_partition(values['start_time'].year)
+
+        venue = Venue.query.get(values['venue_id'])
+        show_time = ShowTime(start_time=values['start_time'])
+        artist = Artist.query.get(values['artist_id'])
+        show = Show(start_time=values['start_time'])
+        show.artist = artist
+        show.venue = venue
+        show.show_time = show_time
+        db.session.commit()
+        after_write('show', show_time.id)
+        # on successful db insert, flash success
+        flash('Show was successfully listed!')
+    except WRITE_ERRORS:
+        current_app.logger.exception('Show could not be listed')
+        db.session.rollback()
+        flash('An error occurred. Show could not be listed.')
+    finally:
+        db.session.close()
+
+    return render_template('pages/home.html')
@@ -0,0 +1,273 @@
+from datetime import datetime
+from flask import Blueprint, current_app, render_template, request, flash, redirect, url_for, abort, jsonify
+from sqlalchemy.orm.exc import StaleDataError
+from autocomplete import autocomplete
+import feeds
+from models import db, Venue, Show, Artist
+from partitions import all_shows
+from views import (WRITE_ERRORS, EditConflict, after_write, apply_changes, cached_search,
+                   check_csrf, delete_entities, flash_errors, flash_rejected, render_cached,
+                   validate_form)
+import validation
+
+bp = Blueprint('venues', __name__)
+
+#----------------------------------------------------------------------------#
+# Venues.
+#----------------------------------------------------------------------------#
+
+def venues_data():
+    data = []
+
+    # every venue with its upcoming show count, grouped by city and state
+    upcoming = db.session.query(Show.venue_id, db.func.count().label('num_upcoming_shows')).filter(
+        Show.start_time > datetime.now()).group_by(Show.venue_id).subquery()
+    venues = db.session.query(
+        Venue.city, Venue.state, Venue.id, Venue.name, db.func.coalesce(upcoming.c.num_upcoming_shows, 0)
+    ).outerjoin(upcoming, upcoming.c.venue_id == Venue.id).order_by(Venue.state, Venue.city, Venue.id).all()
+
+    for city, state, v_id, v_name, num_upcoming in venues:
+        if not data or (data[-1]['city'], data[-1]['state']) != (city, state):
+            data.append({
+                'city': city,
+                'state': state,
+                'venues': []
+            })
+
+        data[-1]['venues'].append({
+            'id': v_id,
+            'name': v_name,
+            'num_upcoming_shows': num_upcoming
+        })
+
+    return data
+
+
+@bp.route('/venues')
+def venues():
+    return render_cached('venues', 'pages/venues.html', 'areas', venues_data)
+
+
+def venue_search_data(term):
+    # upcoming show counts for every match in one grouped query
+    upcoming = db.session.query(Show.venue_id, db.func.count().label('num_upcoming_shows')).filter(
+        Show.start_time > datetime.now()).group_by(Show.venue_id).subquery()
+    venues = db.session.query(Venue.id, Venue.name, db.func.coalesce(upcoming.c.num_upcoming_shows, 0)).outerjoin(
+        upcoming, upcoming.c.venue_id == Venue.id).filter(Venue.name.ilike('%' + term + '%')).all()
+
+    return {
+        "count": len(venues),
+        "data": [{
+            "id": venue_id,
+            "name": name,
+            "num_upcoming_shows": num_upcoming
+        } for venue_id, name, num_upcoming in venues]
+    }
+
+
+@bp.route('/venues/search', methods=['POST'])
+def search_venues():
+    # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
+    # seach for Hop should return "The Musical Hop".
+    # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
+    term = request.form.get('search_term', '')
+    response = cached_search('venue', term, lambda: venue_search_data(term))
+    return render_template('pages/search_venues.html', results=response, search_term=term)
+
+
+def venue_data(venue_id):
+    venue = Venue.query.get(venue_id)
+
+    # show non existent
+    if venue is None:
+        return None
+
+    data = {
+        "id": venue.id,
+        "name": venue.name,
+        "genres": venue.genres,
+        "address": venue.address,
+        "city": venue.city,
+        "state": venue.state,
+        "phone": venue.phone,
+        "website": venue.website,
+        "facebook_link": venue.facebook_link,
+        "seeking_talent": venue.seeking_talent,
+        "seeking_description": venue.seeking_description,
+        "image_link": venue.image_link,
+        "past_shows": [],
+        "upcoming_shows": [],
+        "past_shows_count": 0,
+        "upcoming_shows_count": 0
+    }
+
+    # build up info about shows
+    # past shows may live in archived partitions, upcoming ones never do
+    now = datetime.now()
+    shows = all_shows()
+    past_shows = db.session.query(Artist.id, Artist.name, Artist.image_link, shows.c.start_time).join(
+        shows, shows.c.artist_id == Artist.id).filter(shows.c.venue_id == venue_id, shows.c.start_time <= now).all()
+    upcoming_shows = db.session.query(Artist.id, Artist.name, Artist.image_link, Show.start_time).select_from(
+        Artist).join(Show).filter(Show.venue_id == venue_id, Show.start_time > now).all()
+
+    for show in past_shows:
+        a_id, a_name, a_link, s_start = show
+        data["past_shows"].append({
+            "artist_id": a_id,
+            "artist_name": a_name,
+            "artist_image_link": a_link,
+            "start_time": s_start.strftime("%Y-%m-%d %H:%M:%S")
+        })
+
+    for show in upcoming_shows:
+        a_id, a_name, a_link, s_start = show
+        data["upcoming_shows"].append({
+            "artist_id": a_id,
+            "artist_name": a_name,
+            "artist_image_link": a_link,
+            "start_time": s_start.strftime("%Y-%m-%d %H:%M:%S")
+        })
+
+    data["past_shows_count"] = len(data["past_shows"])
+    data["upcoming_shows_count"] = len(data["upcoming_shows"])
+
+    return data
+
+
+@bp.route('/venues/autocomplete')
+def autocomplete_venues():
+    return jsonify(autocomplete.search('venue', request.args.get('q', '')))
+
+
+@bp.route('/venues/<int:venue_id>/schedule.<any(ics, json):fmt>')
+def venue_schedule(venue_id, fmt):
+    return feeds.schedule(Venue.query.get_or_404(venue_id), fmt)
+
+
+@bp.route('/venues/<int:venue_id>')
+def show_venue(venue_id):
+    # shows the venue page with the given venue_id
+    return render_cached('venue:%d' % venue_id, 'pages/show_venue.html', 'venue',
+                         lambda: venue_data(venue_id))
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+
+@bp.route('/venues/create', methods=['GET'])
+def create_venue_form():
+    from forms import VenueForm
+    form = VenueForm()
+    return render_template('forms/new_venue.html', form=form)
+
+
+@bp.route('/venues/create', methods=['POST'])
+def create_venue_submission():
+    try:
+        values = validate_form(validation.VENUE)
+    except validation.ValidationError as e:
+        flash_errors(e)
+        return render_template('pages/home.html')
+
+    try:
+        venue = Venue(**values)
+        db.session.add(venue)
+        db.session.commit()
+        after_write('venue', venue.id)
+        flash('Venue ' + values['name'] + ' was successfully listed!')
+    except WRITE_ERRORS:
+        current_app.logger.exception('Venue %r could not be listed', values['name'])
+        db.session.rollback()
+        flash('An error occured. Venue ' + values['name'] + ' could not be listed!')
+    finally:
+        db.session.close()
+    return render_template('pages/home.html')
+
+
+@bp.route('/venues/<int:venue_id>/delete', methods=['GET'])
+def delete_venue_form(venue_id):
+    # not page cached, unlike the detail page, so it can carry a CSRF token
+    venue = Venue.query.get_or_404(venue_id)
+    return render_template('forms/delete.html', kind='venue', name=venue.name,
+                           cancel=url_for('venues.show_venue', venue_id=venue_id))
+
+
+@bp.route('/venues/<int:venue_id>/delete', methods=['POST'])
+def delete_venue(venue_id):
+    venue = Venue.query.get_or_404(venue_id)
+    name = venue.name
+
+    try:
+        check_csrf()
+    except validation.ValidationError as e:
+        flash_errors(e)
+        return redirect(url_for('venues.delete_venue_form', venue_id=venue_id))
+
+    try:
+        delete_entities(Venue, [venue_id])
+        after_write('venue', venue_id)
+        flash('Venue "' + name + '" and its shows have been removed.')
+    except WRITE_ERRORS:
+        current_app.logger.exception('Venue %d could not be removed', venue_id)
+        db.session.rollback()
+        flash('An error occurred. Venue "' + name + '" could not be removed.')
+    finally:
+        db.session.close()
+
+    return redirect(url_for('main.index'))
+
+#  Update
+#  ----------------------------------------------------------------
+
+
+def edit_venue_form(venue):
+    # the edit form as the row stands now, whatever was posted
+    from forms import VenueForm
+    return VenueForm(formdata=None, obj=venue, website_link=venue.website, version=venue.version_id)
+
+
+@bp.route('/venues/<int:venue_id>/edit', methods=['GET'])
+def edit_venue(venue_id):
+    venue = Venue.query.get(venue_id)
+
+    if venue is None:
+        abort(404)
+
+    return render_template('forms/edit_venue.html', form=edit_venue_form(venue), venue=venue)
+
+
+@bp.route('/venues/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+    venue = Venue.query.get(venue_id)
+
+    if venue is None:
+        abort(404)
+
+    try:
+        values = validate_form(validation.VENUE)
+    except validation.ValidationError as e:
+        flash_errors(e)
+        from forms import VenueForm
+        return render_template('forms/edit_venue.html', form=VenueForm(), venue=venue), 400
+
+    try:
+        changed = apply_changes(venue, request.form.get('version'), values)
+
+        if changed:
+            db.session.commit()
+            after_write('venue', venue_id)
+    except (EditConflict, StaleDataError):
+        db.session.rollback()
+        venue = Venue.query.get_or_404(venue_id)
+        flash('Venue ' + venue.name + ' was changed by someone else while you were editing. '
+              'Check the current details and submit your changes again.')
+        flash_rejected(venue, values)
+        return render_template('forms/edit_venue.html', form=edit_venue_form(venue), venue=venue), 409
+    except WRITE_ERRORS:
+        current_app.logger.exception('Venue %d could not be updated', venue_id)
+        db.session.rollback()
+        flash('An error occurred. Venue ' + values['name'] + ' could not be updated.')
+    finally:
+        db.session.close()
+
+    return redirect(url_for('venues.show_venue', venue_id=venue_id))